@@ -1,4 +1,12 @@
 # -*- coding: utf-8 -*-
 
 from . import models
-from . import controllers
\ No newline at end of file
+from . import controllers
+
+from .models.dashboard_cache import create_cache_version_table
+
+
+def post_init_hook(env):
+    """Crear la tabla de versiones de la caché del dashboard y el resumen de cajas"""
+    create_cache_version_table(env.cr)
+    env['cash.box.summary']._rebuild()
@@ -1,6 +1,6 @@
 {
     'name': 'Caja Chica',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'summary': 'Gestión de Caja Chica, Caja de Distribución y Recibos de Constancia',
     'description': """
         Módulo para la gestión de:
@@ -27,20 +27,25 @@
         'security/ir.model.access.csv',
         'data/sequence_data.xml',
         'data/payment_types_data.xml',
+        'data/ir_cron_data.xml',
         'views/caja_chica_views.xml',
         'views/caja_chica_menus.xml',
         'views/distribution_cash_views.xml',
         'views/distribution_cash_menus.xml',
         'views/logistics_cash_views.xml',
         'views/logistics_cash_menus.xml',
+        'views/cash_box_views.xml',
         'views/cash_receipt_views.xml',
         'views/cash_receipt_menus.xml',
         'views/pay_invoice_wizard_views.xml',
+        'views/cash_line_import_wizard_views.xml',
+        'views/cash_box_summary_views.xml',
         'reports/paperformat.xml',
         'reports/peruanita_layout_background_horizontal.xml',
         'reports/receipt_layout.xml',
         'reports/caja_chica_report.xml',
         'reports/distribution_cash_report.xml',
+        'reports/cash_box_report.xml',
         'reports/cash_receipt_report.xml',
     ],
     'assets': {
@@ -55,6 +60,7 @@
         ],
     },
     'demo': [],
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'auto_install': False,
     'application': True,
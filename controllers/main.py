@@ -1,51 +1,132 @@
 from odoo import http, fields
-from odoo.http import request
+from odoo.http import request, content_disposition
+from dateutil.relativedelta import relativedelta
+from werkzeug.exceptions import BadRequest
+import io
 import json
 
+import xlsxwriter
+
+from ..models.dashboard_cache import dashboard_stats_cache, get_cache_version
+
+# Clave usada por el widget de selección -> modelo de caja
+CASH_BOX_MODELS = {
+    'petty_cash': 'petty.cash',
+    'distribution_cash': 'distribution.cash',
+    'logistics_cash': 'logistics.cash',
+}
+
+# Modelos de caja exportables a Excel
+XLSX_EXPORT_MODELS = set(CASH_BOX_MODELS.values()) | {'cash.box'}
+
+# Columnas de la exportación a Excel: mismas que el reporte PDF
+XLSX_EXPORT_HEADERS = [
+    'CAJA', 'FECHA', 'DOCUMENTO', 'N°', 'PROVEEDOR', 'CONCEPTO', 'INGRESO', 'EGRESO', 'SALDO',
+]
+
 
 class CajaChicaController(http.Controller):
 
+    def _get_cached_stats(self, key, compute, refresh=False):
+        """Servir estadísticas desde la caché por usuario y compañías, calculándolas si faltan
+
+        La versión de la caché del usuario forma parte de la clave, de modo que un
+        cambio en sus cajas hecho en otro worker no se sirve desde entradas anteriores. Con ``refresh`` se ignora la
+        entrada guardada y se vuelve a calcular.
+        """
+        env = request.env
+        version = get_cache_version(env.cr, env.uid)
+        cache_key = (env.cr.dbname, env.uid, tuple(env.companies.ids), version, key)
+        stats = None if refresh else dashboard_stats_cache.get(cache_key)
+        if stats is None:
+            stats = compute()
+            dashboard_stats_cache.set(cache_key, stats)
+        return stats
+
+    def _empty_stats(self):
+        return {'total': 0, 'draft': 0, 'open': 0, 'closed': 0, 'cancelled': 0, 'balance': 0.0}
+
+    def _add_state_stats(self, stats, state, count, balance):
+        stats[state or 'draft'] += count
+        stats['total'] += count
+        if state == 'open':
+            stats['balance'] = balance
+
+    def _get_box_stats(self, model_name, domain):
+        """Contar cajas por estado y sumar el saldo de las abiertas con una consulta agrupada"""
+        stats = self._empty_stats()
+        groups = request.env[model_name]._read_group(
+            domain, ['state'], ['__count', 'current_balance:sum'])
+        for state, count, balance in groups:
+            self._add_state_stats(stats, state, count, balance)
+        return stats
+
+    def _get_summary_stats(self, domain):
+        """Estadísticas de todos los tipos de caja con una consulta sobre el resumen de cajas
+
+        Las cajas configurables (``cash.box``) se informan bajo el código de su tipo.
+        """
+        stats = {key: self._empty_stats() for key in CASH_BOX_MODELS}
+        for box_type in request.env['cash.box.type'].search([]):
+            stats[box_type.code] = self._empty_stats()
+        keys = {model_name: key for key, model_name in CASH_BOX_MODELS.items()}
+        groups = request.env['cash.box.summary']._read_group(
+            domain, ['res_model', 'box_type_id', 'state'], ['__count', 'current_balance:sum'])
+        for res_model, box_type, state, count, balance in groups:
+            key = box_type.code if res_model == 'cash.box' else keys[res_model]
+            self._add_state_stats(stats.setdefault(key, self._empty_stats()), state, count, balance)
+        return stats
+
+    def _get_dashboard_data(self, model_name):
+        """Datos del dashboard calculados solo con agregados agrupados"""
+        domain = [('responsible_id', '=', request.env.user.id)]
+        stats = self._get_box_stats(model_name, domain)
+
+        # Cajas del mes actual (mismo mes y mismo año)
+        first_day = fields.Date.today().replace(day=1)
+        monthly_cajas = request.env[model_name].search_count(domain + [
+            ('date', '>=', first_day),
+            ('date', '<', first_day + relativedelta(months=1)),
+        ])
+
+        return {
+            'total_cajas': stats['total'],
+            'open_cajas': stats['open'],
+            'total_balance': stats['balance'],
+            'monthly_cajas': monthly_cajas,
+        }
+
+    def _get_quick_stats(self, model_name):
+        """Estadísticas rápidas por estado con una sola consulta agrupada"""
+        stats = self._get_box_stats(model_name, [('responsible_id', '=', request.env.user.id)])
+        return {
+            'draft': stats['draft'],
+            'open': stats['open'],
+            'closed': stats['closed'],
+            'total': stats['total'],
+            'total_balance': stats['balance'],
+        }
+
+    @http.route('/cash_box/dashboard_stats', type='json', auth='user')
+    def get_cash_box_dashboard_stats(self, refresh=False):
+        """Estadísticas de los tres tipos de caja del usuario en una sola petición"""
+        domain = [('responsible_id', '=', request.env.user.id)]
+        return self._get_cached_stats(
+            'dashboard_stats', lambda: self._get_summary_stats(domain), refresh=refresh)
+
     @http.route('/petty_cash/dashboard_data', type='json', auth='user')
-    def get_dashboard_data(self):
+    def get_dashboard_data(self, refresh=False):
         """Obtener datos para el dashboard de caja chica"""
-        user = request.env.user
-        CajaChica = request.env['petty.cash']
-        
-        # Estadísticas del usuario actual
-        my_cajas = CajaChica.search([('responsible_id', '=', user.id)])
-        open_cajas = my_cajas.filtered(lambda c: c.state == 'open')
-        
-        data = {
-            'total_cajas': len(my_cajas),
-            'open_cajas': len(open_cajas),
-            'total_balance': sum(open_cajas.mapped('current_balance')),
-            'monthly_cajas': len(my_cajas.filtered(
-                lambda c: c.date.month == fields.Date.today().month
-            ))
-        }
-        
-        return data
+        return self._get_cached_stats(
+            ('dashboard_data', 'petty.cash'), lambda: self._get_dashboard_data('petty.cash'),
+            refresh=refresh)
 
     @http.route('/petty_cash/quick_stats', type='json', auth='user')
-    def get_quick_stats(self):
+    def get_quick_stats(self, refresh=False):
         """Estadísticas rápidas para el widget de selección"""
-        CajaChica = request.env['petty.cash']
-        
-        # Contar cajas por estado
-        domain_base = [('responsible_id', '=', request.env.user.id)]
-        
-        stats = {
-            'draft': CajaChica.search_count(domain_base + [('state', '=', 'draft')]),
-            'open': CajaChica.search_count(domain_base + [('state', '=', 'open')]),
-            'closed': CajaChica.search_count(domain_base + [('state', '=', 'closed')]),
-            'total': CajaChica.search_count(domain_base)
-        }
-        
-        # Saldo total de cajas abiertas
-        open_cajas = CajaChica.search(domain_base + [('state', '=', 'open')])
-        stats['total_balance'] = sum(open_cajas.mapped('current_balance'))
-        
-        return stats
+        return self._get_cached_stats(
+            ('quick_stats', 'petty.cash'), lambda: self._get_quick_stats('petty.cash'),
+            refresh=refresh)
 
     @http.route('/petty_cash/create_quick', type='json', auth='user')
     def create_quick_caja(self, **kwargs):
@@ -74,49 +155,84 @@ class CajaChicaController(http.Controller):
                 'error': str(e)
             }
 
+    # ========== EXPORTACIÓN A EXCEL ==========
+
+    def _write_cash_box_xlsx(self, output, boxes):
+        """Escribir los movimientos de las cajas fila por fila con memoria constante
+
+        Las líneas se leen con un único ``search_read`` y xlsxwriter en modo
+        ``constant_memory`` vuelca cada fila a disco al pasar a la siguiente.
+        """
+        line_field = boxes._fields['line_ids']
+        Line = request.env[line_field.comodel_name]
+        box_field = line_field.inverse_name
+        lines = Line.search_read(
+            [(box_field, 'in', boxes.ids)],
+            [box_field, 'date', 'document_type', 'document_number', 'partner_name',
+             'description', 'line_type', 'amount', 'balance'],
+            order=f'{box_field}, sequence, id',
+            load=None,
+        )
+        box_names = dict(zip(boxes.ids, boxes.mapped('name')))
+        document_types = dict(Line._fields['document_type']._description_selection(request.env))
+
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        sheet = workbook.add_worksheet('Movimientos')
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'bg_color': '#D9D9D9'})
+        date_format = workbook.add_format({'num_format': 'dd/mm/yyyy'})
+        amount_format = workbook.add_format({'num_format': '#,##0.00'})
+        for col, width in enumerate([18, 12, 14, 16, 30, 45, 14, 14, 14]):
+            sheet.set_column(col, col, width)
+
+        sheet.write_row(0, 0, XLSX_EXPORT_HEADERS, header_format)
+        for row, line in enumerate(lines, start=1):
+            sheet.write_string(row, 0, box_names.get(line[box_field]) or '')
+            if line['date']:
+                sheet.write_datetime(row, 1, line['date'], date_format)
+            sheet.write_string(row, 2, document_types.get(line['document_type'], ''))
+            sheet.write_string(row, 3, line['document_number'] or '')
+            sheet.write_string(row, 4, line['partner_name'] or '')
+            sheet.write_string(row, 5, line['description'] or '')
+            column = 6 if line['line_type'] == 'income' else 7
+            sheet.write_number(row, column, line['amount'], amount_format)
+            sheet.write_number(row, 8, line['balance'], amount_format)
+        workbook.close()
+
+    @http.route('/cash_box/export_xlsx', type='http', auth='user')
+    def export_cash_box_xlsx(self, model, ids, **kwargs):
+        """Descargar en Excel los movimientos de una o varias cajas"""
+        if model not in XLSX_EXPORT_MODELS:
+            raise BadRequest("Modelo de caja no exportable.")
+        try:
+            box_ids = [int(box_id) for box_id in ids.split(',') if box_id]
+        except ValueError:
+            raise BadRequest("Identificadores de caja no válidos.")
+        boxes = request.env[model].browse(box_ids).exists()
+        boxes.check_access('read')
+
+        output = io.BytesIO()
+        self._write_cash_box_xlsx(output, boxes)
+        filename = f'{boxes[:1].name or "Cajas"}.xlsx' if len(boxes) == 1 else 'Movimientos de Cajas.xlsx'
+        return request.make_response(output.getvalue(), headers=[
+            ('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
+
     # ========== CONTROLADORES PARA CAJA DE DISTRIBUCIÓN ==========
 
     @http.route('/distribution_cash/dashboard_data', type='json', auth='user')
-    def get_distribution_dashboard_data(self):
+    def get_distribution_dashboard_data(self, refresh=False):
         """Obtener datos para el dashboard de caja de distribución"""
-        user = request.env.user
-        DistributionCash = request.env['distribution.cash']
-        
-        # Estadísticas del usuario actual
-        my_cajas = DistributionCash.search([('responsible_id', '=', user.id)])
-        open_cajas = my_cajas.filtered(lambda c: c.state == 'open')
-        
-        data = {
-            'total_cajas': len(my_cajas),
-            'open_cajas': len(open_cajas),
-            'total_balance': sum(open_cajas.mapped('current_balance')),
-            'monthly_cajas': len(my_cajas.filtered(
-                lambda c: c.date.month == fields.Date.today().month
-            ))
-        }
-        
-        return data
+        return self._get_cached_stats(
+            ('dashboard_data', 'distribution.cash'), lambda: self._get_dashboard_data('distribution.cash'),
+            refresh=refresh)
 
     @http.route('/distribution_cash/quick_stats', type='json', auth='user')
-    def get_distribution_quick_stats(self):
+    def get_distribution_quick_stats(self, refresh=False):
         """Estadísticas rápidas para caja de distribución"""
-        DistributionCash = request.env['distribution.cash']
-        
-        # Contar cajas por estado
-        domain_base = [('responsible_id', '=', request.env.user.id)]
-        
-        stats = {
-            'draft': DistributionCash.search_count(domain_base + [('state', '=', 'draft')]),
-            'open': DistributionCash.search_count(domain_base + [('state', '=', 'open')]),
-            'closed': DistributionCash.search_count(domain_base + [('state', '=', 'closed')]),
-            'total': DistributionCash.search_count(domain_base)
-        }
-        
-        # Saldo total de cajas abiertas
-        open_cajas = DistributionCash.search(domain_base + [('state', '=', 'open')])
-        stats['total_balance'] = sum(open_cajas.mapped('current_balance'))
-        
-        return stats
+        return self._get_cached_stats(
+            ('quick_stats', 'distribution.cash'), lambda: self._get_quick_stats('distribution.cash'),
+            refresh=refresh)
 
     @http.route('/distribution_cash/create_quick', type='json', auth='user')
     def create_quick_distribution(self, **kwargs):
@@ -148,46 +264,18 @@ class CajaChicaController(http.Controller):
     # ========== CONTROLADORES PARA CAJA DE LOGÍSTICA ==========
 
     @http.route('/logistics_cash/dashboard_data', type='json', auth='user')
-    def get_logistics_dashboard_data(self):
+    def get_logistics_dashboard_data(self, refresh=False):
         """Obtener datos para el dashboard de caja de logística"""
-        user = request.env.user
-        LogisticsCash = request.env['logistics.cash']
-        
-        # Estadísticas del usuario actual
-        my_cajas = LogisticsCash.search([('responsible_id', '=', user.id)])
-        open_cajas = my_cajas.filtered(lambda c: c.state == 'open')
-        
-        data = {
-            'total_cajas': len(my_cajas),
-            'open_cajas': len(open_cajas),
-            'total_balance': sum(open_cajas.mapped('current_balance')),
-            'monthly_cajas': len(my_cajas.filtered(
-                lambda c: c.date.month == fields.Date.today().month
-            ))
-        }
-        
-        return data
+        return self._get_cached_stats(
+            ('dashboard_data', 'logistics.cash'), lambda: self._get_dashboard_data('logistics.cash'),
+            refresh=refresh)
 
     @http.route('/logistics_cash/quick_stats', type='json', auth='user')
-    def get_logistics_quick_stats(self):
+    def get_logistics_quick_stats(self, refresh=False):
         """Estadísticas rápidas para caja de logística"""
-        LogisticsCash = request.env['logistics.cash']
-        
-        # Contar cajas por estado
-        domain_base = [('responsible_id', '=', request.env.user.id)]
-        
-        stats = {
-            'draft': LogisticsCash.search_count(domain_base + [('state', '=', 'draft')]),
-            'open': LogisticsCash.search_count(domain_base + [('state', '=', 'open')]),
-            'closed': LogisticsCash.search_count(domain_base + [('state', '=', 'closed')]),
-            'total': LogisticsCash.search_count(domain_base)
-        }
-        
-        # Saldo total de cajas abiertas
-        open_cajas = LogisticsCash.search(domain_base + [('state', '=', 'open')])
-        stats['total_balance'] = sum(open_cajas.mapped('current_balance'))
-        
-        return stats
+        return self._get_cached_stats(
+            ('quick_stats', 'logistics.cash'), lambda: self._get_quick_stats('logistics.cash'),
+            refresh=refresh)
 
     @http.route('/logistics_cash/create_quick', type='json', auth='user')
     def create_quick_logistics(self, **kwargs):
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, SUPERUSER_ID
+
+from odoo.addons.petty_cash.models.dashboard_cache import create_cache_version_table
+
+
+def migrate(cr, version):
+    """Crear en las bases ya instaladas la tabla de versiones de la caché y el resumen de cajas
+
+    El resumen se reconstruye una única vez aquí; las actualizaciones posteriores del
+    módulo ya no lo recorren entero.
+    """
+    create_cache_version_table(cr)
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['cash.box.summary']._rebuild()
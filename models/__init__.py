@@ -1,6 +1,15 @@
+from . import ir_sequence
+from . import ir_actions_report
 from . import payment_type
+from . import res_users
+from . import cash_box_summary
+from . import cash_box_mixin
 from . import caja_chica
 from . import distribution_cash
 from . import logistics_cash
+from . import cash_box_type
+from . import cash_box
 from . import cash_receipt
-from . import pay_invoice_wizard
\ No newline at end of file
+from . import report_cash_receipt
+from . import pay_invoice_wizard
+from . import cash_line_import_wizard
\ No newline at end of file
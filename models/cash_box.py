@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class CashBox(models.Model):
+    """Caja de un tipo configurable: los nuevos tipos se crean como datos, sin modelos nuevos"""
+    _name = 'cash.box'
+    _description = 'Caja'
+    _inherit = 'cash.box.mixin'
+
+    _cash_sequence_code = 'cash.box'
+    _cash_sequence_fallback = 'CAJA/001'
+    _cash_box_label = 'Caja'
+
+    box_type_id = fields.Many2one(
+        'cash.box.type',
+        string='Tipo de Caja',
+        required=True,
+        index=True,
+        ondelete='restrict',
+        tracking=True
+    )
+    journal_id = fields.Many2one(
+        compute='_compute_journal_id',
+        store=True,
+        readonly=False,
+        precompute=True
+    )
+    posting_granularity = fields.Selection(
+        compute='_compute_posting_granularity',
+        store=True,
+        readonly=False,
+        precompute=True
+    )
+
+    # Relaciones
+    line_ids = fields.One2many(
+        'cash.box.line',
+        'cash_box_id',
+        string='Movimientos'
+    )
+
+    @api.depends('box_type_id')
+    def _compute_journal_id(self):
+        for record in self:
+            if record.box_type_id.journal_id:
+                record.journal_id = record.box_type_id.journal_id
+            else:
+                # Sin diario en el tipo se conserva el elegido a mano
+                record.journal_id = record.journal_id
+
+    @api.depends('box_type_id')
+    def _compute_posting_granularity(self):
+        for record in self:
+            record.posting_granularity = record.box_type_id.posting_granularity or 'line'
+
+    def _get_cash_box_label(self):
+        return self.box_type_id.name or self._cash_box_label
+
+    def _get_next_sequences(self):
+        """Numerar con la secuencia de cada tipo, una reserva en lote por tipo y compañía"""
+        names = {}
+        for (box_type, company), records in self.grouped(lambda r: (r.box_type_id, r.company_id)).items():
+            if box_type.sequence_id:
+                numbers = box_type.sequence_id.with_company(company)._next_batch(len(records))
+            else:
+                numbers = super(CashBox, records)._get_next_sequences()
+            names.update(zip(records, numbers))
+        return [names[record] for record in self]
+
+    def action_print_report(self):
+        """Imprimir con el formato configurado en el tipo de caja"""
+        report = self.box_type_id[:1].report_id or self.env.ref('petty_cash.action_report_cash_box')
+        return report.report_action(self)
+
+
+class CashBoxLine(models.Model):
+    _name = 'cash.box.line'
+    _description = 'Línea de Caja'
+    _inherit = 'cash.box.line.mixin'
+
+    _cash_box_field = 'cash_box_id'
+
+    # Relación principal
+    cash_box_id = fields.Many2one(
+        'cash.box',
+        string='Caja',
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        related='cash_box_id.company_id',
+        store=True,
+        readonly=True
+    )
+    box_type_id = fields.Many2one(
+        related='cash_box_id.box_type_id',
+        store=True,
+        string='Tipo de Caja'
+    )
@@ -0,0 +1,1349 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from collections import defaultdict
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError, UserError
+
+from .dashboard_cache import bump_cache_versions, dashboard_stats_cache
+from .ir_actions_report import report_cache_name
+
+_logger = logging.getLogger(__name__)
+
+# Campos de la caja que alteran el resumen y las estadísticas del dashboard
+DASHBOARD_FIELDS = {'name', 'state', 'responsible_id', 'company_id', 'date', 'initial_amount'}
+
+
+class CashBoxMixin(models.AbstractModel):
+    """Motor común de las cajas: totales, secuencias, asientos y estados
+
+    Los modelos concretos definen ``line_ids`` y los atributos de clase siguientes.
+    """
+    _name = 'cash.box.mixin'
+    _description = 'Motor de Cajas'
+    _order = 'date desc, id desc'
+    _rec_name = 'display_name'
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+
+    # Código de la secuencia, número por defecto si no existe y nombre en los mensajes
+    _cash_sequence_code = None
+    _cash_sequence_fallback = None
+    _cash_box_label = None
+
+    # Campos básicos
+    name = fields.Char(
+        string='Número',
+        copy=False,
+        readonly=True,
+        default='Borrador'
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        default=lambda self: self.env.company
+    )
+    date = fields.Date(
+        string='Fecha',
+        required=True,
+        index=True,
+        default=fields.Date.context_today
+    )
+    responsible_id = fields.Many2one(
+        'res.users',
+        string='Responsable',
+        required=True,
+        default=lambda self: self.env.user
+    )
+    
+    journal_id = fields.Many2one(
+        'account.journal',
+        string='Diario Contable',
+        domain="[('type', 'in', ['cash', 'bank']), ('company_id', '=', company_id)]",
+        required=True,
+        check_company=True,
+        help='Diario contable asociado a esta caja'
+    )
+
+    initial_payment_type_id = fields.Many2one(
+        'payment.type',
+        string='Tipo de Pago Inicial'
+    )
+
+    initial_operation_number = fields.Char(
+        string='Número de Operación/Cheque',
+        help='Número de operación bancaria, cheque u otro documento'
+    )
+    
+    # Información financiera
+    initial_amount = fields.Float(
+        string='Monto Inicial',
+        required=True,
+        default=0.0
+    )
+    total_income = fields.Float(
+        string='Total Ingresos',
+        compute='_compute_totals',
+        store=True
+    )
+    total_expense = fields.Float(
+        string='Total Egresos',
+        compute='_compute_totals',
+        store=True
+    )
+    current_balance = fields.Float(
+        string='Saldo Actual',
+        compute='_compute_totals',
+        store=True
+    )
+    
+    # Estados
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('open', 'Abierta'),
+        ('closed', 'Cerrada'),
+        ('cancelled', 'Cancelada')
+    ], string='Estado', default='draft', tracking=True, index=True)
+    
+    # Contabilidad
+    move_id = fields.Many2one(
+        'account.move',
+        string='Asiento Contable',
+        readonly=True,
+        help='Asiento contable generado al abrir la caja'
+    )
+    
+    closing_move_id = fields.Many2one(
+        'account.move',
+        string='Asiento de Cierre',
+        readonly=True,
+        help='Asiento contable generado al cerrar la caja'
+    )
+    
+    # Campo calculado para mostrar nombre
+    display_name = fields.Char(
+        string='Nombre para Mostrar',
+        compute='_compute_display_name',
+        store=True
+    )
+
+    # Agrupación de asientos
+    posting_granularity = fields.Selection([
+        ('line', 'Por Movimiento'),
+        ('day', 'Diario'),
+        ('close', 'Al Cierre')
+    ], string='Asientos Contables', required=True, default='line',
+        help='Por Movimiento: un asiento por cada movimiento. '
+             'Diario: un asiento por día con todos los movimientos del día. '
+             'Al Cierre: un único asiento con todos los movimientos al cerrar la caja.')
+
+    # Contabilización diferida
+    deferred_posting = fields.Boolean(
+        string='Contabilización Diferida',
+        help='Si está marcado, los movimientos se guardan sin generar asientos ni pagos '
+             'y un proceso programado los contabiliza por lotes'
+    )
+    posting_queue_count = fields.Integer(
+        string='Pendientes de Contabilizar',
+        compute='_compute_posting_queue'
+    )
+    posting_failed_count = fields.Integer(
+        string='Con Error de Contabilización',
+        compute='_compute_posting_queue'
+    )
+    posting_queue_lag = fields.Float(
+        string='Retraso de Contabilización (horas)',
+        compute='_compute_posting_queue',
+        help='Antigüedad del movimiento en cola más antiguo'
+    )
+
+    def init(self):
+        if self._abstract:
+            return
+        # Regla de registro y consultas del dashboard: responsable + estado
+        tools.create_index(
+            self.env.cr, f'{self._table}_responsible_id_state_index',
+            self._table, ['responsible_id', 'state'],
+        )
+
+    @api.model
+    def create(self, vals):
+        """Crear registro en borrador sin secuencia"""
+        # No asignar secuencia en la creación, usar 'Borrador'
+        if 'name' not in vals or not vals.get('name'):
+            vals['name'] = 'Borrador'
+        record = super(CashBoxMixin, self).create(vals)
+        record._on_cash_box_change()
+        return record
+
+    def write(self, vals):
+        """Actualizar el resumen y el dashboard si cambia el estado o el saldo"""
+        # Las acciones en lote difieren la actualización hasta su última escritura
+        if self.env.context.get('defer_cash_box_change') or not DASHBOARD_FIELDS.intersection(vals):
+            return super(CashBoxMixin, self).write(vals)
+        previous_users = self.responsible_id
+        res = super(CashBoxMixin, self).write(vals)
+        self._on_cash_box_change(previous_users)
+        return res
+
+    def _on_cash_box_change(self, users=None):
+        """Propagar un cambio de las cajas al resumen y a la caché del dashboard"""
+        self.env['cash.box.summary'].sudo()._sync_boxes(self)
+        self._invalidate_dashboard_stats(users)
+
+    def _invalidate_dashboard_stats(self, users=None):
+        """Descartar las estadísticas en caché de los responsables de las cajas"""
+        dbname = self.env.cr.dbname
+        user_ids = set((self.responsible_id | (users or self.env['res.users'])).ids)
+        if not user_ids:
+            return
+        dashboard_stats_cache.invalidate(dbname, user_ids)
+        # Evitar que otra petición repueble la caché con datos previos al commit
+        self.env.cr.postcommit.add(lambda: dashboard_stats_cache.invalidate(dbname, user_ids))
+        # Los demás workers descartan las entradas de estos usuarios al cambiar su
+        # versión, registrada una sola vez por transacción justo antes del commit
+        cr = self.env.cr
+        pending = cr.precommit.data.setdefault('petty_cash.dashboard_cache_users', set())
+        if not pending:
+            cr.precommit.add(lambda: bump_cache_versions(cr, pending))
+        pending.update(user_ids)
+
+    def _lock_and_check_withdrawal(self, amount, lock=True):
+        """Bloquear la caja y validar el retiro contra el saldo vigente en base de datos
+
+        El bloqueo de fila dura hasta el fin de la transacción: los retiros concurrentes
+        de una misma caja se serializan sin afectar al resto de cajas. Si otra transacción
+        ya modificó la caja, PostgreSQL rechaza el bloqueo y Odoo reintenta la petición,
+        que vuelve a leer el saldo actualizado. Por eso debe tomarse lo más tarde
+        posible, justo antes de insertar los movimientos; con ``lock=False`` solo se
+        valida, como comprobación previa sin bloqueo.
+        """
+        self.ensure_one()
+        self.flush_recordset()
+        self.env.cr.execute(
+            f"SELECT state, current_balance FROM {self._table} WHERE id = %s{' FOR UPDATE' if lock else ''}",
+            [self.id],
+        )
+        state, balance = self.env.cr.fetchone()
+        self.invalidate_recordset(['state', 'current_balance'])
+        if state != 'open':
+            raise UserError(f"La caja {self.name} no está abierta.")
+        rounding = self.company_id.currency_id.rounding
+        if tools.float_compare(amount, balance or 0.0, precision_rounding=rounding) > 0:
+            raise UserError(
+                f"Saldo insuficiente en la caja. "
+                f"Saldo disponible: {balance}, Monto a pagar: {amount}"
+            )
+        return balance
+
+    def _get_cash_box_label(self):
+        """Nombre del tipo de caja usado en los mensajes"""
+        return self._cash_box_label
+
+    def _get_report_cache_name(self):
+        """Nombre del PDF guardado del reporte: solo las cajas cerradas ya no cambian"""
+        self.ensure_one()
+        return report_cache_name(self, self.state == 'closed')
+
+    def _get_next_sequence(self):
+        """Obtener la siguiente secuencia disponible"""
+        return self._get_next_sequences()[0]
+
+    def _get_next_sequences(self):
+        """Reservar en lote la siguiente secuencia de cada caja, una llamada por compañía"""
+        names = {}
+        for company, records in self.grouped('company_id').items():
+            numbers = self.env['ir.sequence'].with_company(company).next_batch_by_code(self._cash_sequence_code, len(records))
+            names.update(zip(records, numbers))
+        return [names[record] or self._cash_sequence_fallback for record in self]
+
+    @api.depends('name', 'date', 'responsible_id', 'state')
+    def _compute_display_name(self):
+        for record in self:
+            if record.state == 'draft':
+                record.display_name = f"Borrador - {record.date} ({record.responsible_id.name})"
+            else:
+                record.display_name = f"{record.name} - {record.date} ({record.responsible_id.name})"
+
+    @api.depends('line_ids.amount', 'line_ids.line_type', 'initial_amount')
+    def _compute_totals(self):
+        """Calcular totales con una sola consulta agrupada por caja y tipo"""
+        saved = self.filtered('id')
+        sums = {}
+        line_field = self._fields['line_ids']
+        if saved:
+            groups = self.env[line_field.comodel_name]._read_group(
+                [(line_field.inverse_name, 'in', saved.ids)],
+                [line_field.inverse_name, 'line_type'],
+                ['amount:sum'],
+            )
+            for caja, line_type, amount in groups:
+                sums[caja.id, line_type] = amount
+
+        for record in saved:
+            record.total_income = sums.get((record.id, 'income'), 0.0) + record.initial_amount
+            record.total_expense = sums.get((record.id, 'expense'), 0.0)
+            record.current_balance = record.total_income - record.total_expense
+
+        # Registros sin guardar (formularios en edición): calcular en memoria
+        for record in self - saved:
+            income_lines = record.line_ids.filtered(lambda l: l.line_type == 'income')
+            expense_lines = record.line_ids.filtered(lambda l: l.line_type == 'expense')
+            
+            record.total_income = sum(income_lines.mapped('amount')) + record.initial_amount
+            record.total_expense = sum(expense_lines.mapped('amount'))
+            record.current_balance = record.total_income - record.total_expense
+
+    def _compute_posting_queue(self):
+        """Profundidad y retraso de la cola de contabilización con una consulta agrupada"""
+        queue = {}
+        saved = self.filtered('id')
+        line_field = self._fields['line_ids']
+        if saved:
+            groups = self.env[line_field.comodel_name]._read_group(
+                [(line_field.inverse_name, 'in', saved.ids), ('posting_state', 'in', ('pending', 'failed'))],
+                [line_field.inverse_name, 'posting_state'],
+                ['__count', 'posting_queued_at:min'],
+            )
+            for caja, posting_state, count, queued_at in groups:
+                queue[caja.id, posting_state] = (count, queued_at)
+
+        now = fields.Datetime.now()
+        for record in self:
+            pending_count, oldest = queue.get((record.id, 'pending'), (0, False))
+            record.posting_queue_count = pending_count
+            record.posting_failed_count = queue.get((record.id, 'failed'), (0, False))[0]
+            record.posting_queue_lag = (now - oldest).total_seconds() / 3600.0 if oldest else 0.0
+
+    @api.onchange('initial_amount', 'line_ids')
+    def _onchange_line_balances(self):
+        """Refrescar en el formulario el saldo de todas las líneas al editar una de ellas
+
+        El saldo de una línea ya no depende de las demás; al guardar se desplaza en base
+        de datos, pero en el formulario se recalcula en memoria para las líneas hermanas.
+        """
+        self.line_ids._compute_balance()
+
+    # ========== VALIDACIONES ==========
+    
+    @api.constrains('initial_amount')
+    def _check_initial_amount(self):
+        for record in self:
+            if record.initial_amount < 0:
+                raise ValidationError("El monto inicial no puede ser negativo.")
+
+    @api.constrains('state', 'initial_amount')
+    def _check_open_requirements(self):
+        for record in self:
+            if record.state == 'open' and record.initial_amount <= 0:
+                raise ValidationError(
+                    "No se puede abrir una caja sin un monto inicial mayor a cero. "
+                    f"Monto actual: {record.initial_amount}"
+                )
+
+    @api.constrains('current_balance', 'state')
+    def _check_close_requirements(self):
+        for record in self:
+            if record.state == 'closed' and record.current_balance < 0:
+                raise ValidationError(
+                    "No se puede cerrar una caja con saldo negativo. "
+                    f"Saldo actual: {record.current_balance}"
+                )
+
+    # ========== MÉTODOS DE ACCIÓN ==========
+
+    def _prepare_opening_move_vals(self):
+        """Preparar los valores del asiento contable de apertura de caja"""
+        self.ensure_one()
+        if not self.journal_id:
+            raise UserError("Debe seleccionar un diario contable para la caja.")
+        
+        # Obtener cuenta de caja del diario
+        cash_account = self.journal_id.default_account_id
+        if not cash_account:
+            raise UserError(f"El diario {self.journal_id.name} no tiene una cuenta por defecto configurada.")
+        
+        # Obtener cuenta de contraparte (cuenta transitoria o de control)
+        # Usamos la cuenta de pérdidas y ganancias no asignadas o una cuenta configurable
+        company = self.company_id
+        counterpart_account = company.account_journal_suspense_account_id
+        if not counterpart_account:
+            raise UserError("No se ha configurado una cuenta de suspense en la compañía.")
+        
+        # Crear asiento contable
+        move_vals = {
+            'journal_id': self.journal_id.id,
+            'date': self.date,
+            'ref': f'Apertura {self.name}',
+            'line_ids': [
+                # Débito: Entrada de efectivo en caja
+                (0, 0, {
+                    'name': f'Apertura de {self.name} - Monto Inicial',
+                    'account_id': cash_account.id,
+                    'debit': self.initial_amount,
+                    'credit': 0.0,
+                    'partner_id': False,
+                }),
+                # Crédito: Cuenta de contraparte
+                (0, 0, {
+                    'name': f'Apertura de {self.name} - Monto Inicial',
+                    'account_id': counterpart_account.id,
+                    'debit': 0.0,
+                    'credit': self.initial_amount,
+                    'partner_id': False,
+                }),
+            ],
+        }
+        return move_vals
+
+    def _create_opening_moves(self):
+        """Crear y publicar en lote los asientos de apertura, devueltos en el orden de las cajas"""
+        moves = self.env['account.move'].create([record._prepare_opening_move_vals() for record in self])
+        moves.action_post()
+        return moves
+
+    def _create_opening_move(self):
+        """Crear asiento contable de apertura de caja"""
+        self.ensure_one()
+        return self._create_opening_moves()
+
+    def action_open(self):
+        """Abrir cajas con validaciones, asignar secuencias y crear los asientos en lote"""
+        for record in self:
+            if record.initial_amount <= 0:
+                raise UserError(
+                    f"No se puede abrir la caja {record.name}. "
+                    "El monto inicial debe ser mayor a cero."
+                )
+            if record.state != 'draft':
+                raise UserError(f"Solo se pueden abrir cajas en estado borrador.")
+
+        # Asignar secuencia al abrir la caja, reservando de una vez los números
+        # (el resumen se actualiza con la escritura del estado)
+        to_number = self.filtered(lambda r: r.name == 'Borrador')
+        for record, name in zip(to_number, to_number._get_next_sequences()):
+            record.with_context(defer_cash_box_change=True).name = name
+
+        # Crear asientos contables de apertura
+        opening_moves = self._create_opening_moves()
+        for record, opening_move in zip(self, opening_moves):
+            record.move_id = opening_move
+
+        self.write({'state': 'open'})
+        self._message_log_batch(bodies={
+            record.id: f"{record._get_cash_box_label()} {record.name} abierta con monto inicial: {record.initial_amount}. "
+                       f"Asiento contable: {record.move_id.name}"
+            for record in self
+        })
+
+    def _prepare_closing_move_vals(self):
+        """Preparar los valores del asiento contable de cierre de caja"""
+        self.ensure_one()
+        if not self.journal_id:
+            raise UserError("Debe seleccionar un diario contable para la caja.")
+        
+        # Si el saldo es 0, no crear asiento de cierre
+        if self.current_balance == 0:
+            return False
+        
+        # Obtener cuenta de caja del diario
+        cash_account = self.journal_id.default_account_id
+        if not cash_account:
+            raise UserError(f"El diario {self.journal_id.name} no tiene una cuenta por defecto configurada.")
+        
+        # Obtener cuenta de contraparte
+        company = self.company_id
+        counterpart_account = company.account_journal_suspense_account_id
+        if not counterpart_account:
+            raise UserError("No se ha configurado una cuenta de suspense en la compañía.")
+        
+        # Crear asiento contable de cierre (devolver el saldo)
+        move_vals = {
+            'journal_id': self.journal_id.id,
+            'date': fields.Date.context_today(self),
+            'ref': f'Cierre {self.name}',
+            'line_ids': [
+                # Crédito: Salida de efectivo de caja
+                (0, 0, {
+                    'name': f'Cierre de {self.name} - Devolución de saldo',
+                    'account_id': cash_account.id,
+                    'debit': 0.0,
+                    'credit': self.current_balance,
+                    'partner_id': False,
+                }),
+                # Débito: Cuenta de contraparte
+                (0, 0, {
+                    'name': f'Cierre de {self.name} - Devolución de saldo',
+                    'account_id': counterpart_account.id,
+                    'debit': self.current_balance,
+                    'credit': 0.0,
+                    'partner_id': False,
+                }),
+            ],
+        }
+        return move_vals
+
+    def _create_closing_moves(self):
+        """Crear y publicar en lote los asientos de cierre de las cajas con saldo
+
+        Devuelve un diccionario caja -> asiento de cierre.
+        """
+        to_close = self.filtered(lambda r: r.current_balance != 0)
+        moves = self.env['account.move'].create([record._prepare_closing_move_vals() for record in to_close])
+        moves.action_post()
+        return dict(zip(to_close, moves))
+
+    def _create_closing_move(self):
+        """Crear asiento contable de cierre de caja"""
+        self.ensure_one()
+        return self._create_closing_moves().get(self, False)
+
+    def action_close(self):
+        """Cerrar cajas con validaciones y crear los asientos de cierre en lote"""
+        for record in self:
+            if record.state != 'open':
+                raise UserError("Solo se pueden cerrar cajas abiertas.")
+            if record.current_balance < 0:
+                raise UserError(
+                    f"No se puede cerrar la caja {record.name} con saldo negativo. "
+                    f"Saldo actual: {record.current_balance}"
+                )
+
+        # Contabilizar los movimientos aún en cola antes del cierre
+        queued_lines = self.line_ids.filtered(lambda l: l.posting_state in ('pending', 'failed'))
+        if queued_lines:
+            queued_lines._post_lines()
+            queued_lines.write({'posting_state': 'done', 'posting_error': False})
+
+        # Crear asientos contables de cierre de las cajas con saldo
+        closing_moves = self._create_closing_moves()
+        for record, closing_move in closing_moves.items():
+            record.closing_move_id = closing_move
+
+        self.write({'state': 'closed'})
+
+        bodies = {}
+        for record in self:
+            message = f"{record._get_cash_box_label()} {record.name} cerrada con saldo final: {record.current_balance}"
+            if record in closing_moves:
+                message += f". Asiento de cierre: {closing_moves[record].name}"
+            bodies[record.id] = message
+        self._message_log_batch(bodies=bodies)
+
+    @api.model
+    def _cron_close_month_end(self):
+        """Cerrar por lotes las cajas abiertas de meses anteriores
+
+        Cada lote se confirma por separado, así una ejecución interrumpida se retoma
+        cerrando solo las cajas que siguen abiertas. Las cajas con saldo negativo o que
+        fallan al cerrarse se omiten y se informan en su historial.
+        """
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'petty_cash.month_end_close_chunk_size', 200))
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        first_day = fields.Date.context_today(self).replace(day=1)
+        skipped_ids = []
+        closed_count = 0
+        while True:
+            boxes = self.search([
+                ('state', '=', 'open'),
+                ('date', '<', first_day),
+                ('id', 'not in', skipped_ids),
+            ], order='company_id, id', limit=chunk_size)
+            if not boxes:
+                break
+
+            negative = boxes.filtered(lambda b: b.current_balance < 0)
+            if negative:
+                skipped_ids += negative.ids
+                negative._message_log_batch(bodies={
+                    box.id: f"Cierre de fin de mes omitido: saldo negativo ({box.current_balance})"
+                    for box in negative
+                })
+
+            for company, company_boxes in (boxes - negative).grouped('company_id').items():
+                try:
+                    with self.env.cr.savepoint():
+                        company_boxes.with_company(company).action_close()
+                    closed_count += len(company_boxes)
+                except Exception:
+                    # Reintentar caja por caja: solo se omiten las que fallan de verdad
+                    closed, failed = company_boxes.with_company(company)._close_month_end_one_by_one()
+                    closed_count += len(closed)
+                    skipped_ids += failed.ids
+
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+        _logger.info(
+            "Cierre de fin de mes de %s: %s cajas cerradas, %s omitidas (%s)",
+            self._description, closed_count, len(skipped_ids), skipped_ids,
+        )
+        return skipped_ids
+
+    def _close_month_end_one_by_one(self):
+        """Cerrar cada caja en su propio punto de guardado
+
+        Devuelve las cajas cerradas y las que fallaron; estas últimas quedan abiertas
+        con el motivo del error en su historial.
+        """
+        closed = failed = self.browse()
+        errors = {}
+        for box in self:
+            try:
+                with self.env.cr.savepoint():
+                    box.action_close()
+                closed |= box
+            except Exception as e:
+                _logger.warning("Error en el cierre de fin de mes de %s: %s", box.display_name, e)
+                failed |= box
+                errors[box.id] = f"Cierre de fin de mes omitido: {e}"
+        if errors:
+            failed._message_log_batch(bodies=errors)
+        return closed, failed
+
+    def action_cancel(self):
+        """Cancelar cajas con validaciones"""
+        if any(record.state == 'closed' for record in self):
+            raise UserError("No se puede cancelar una caja que ya está cerrada.")
+
+        self.write({'state': 'cancelled'})
+        self._message_log_batch(bodies={
+            record.id: f"{record._get_cash_box_label()} {record.name} cancelada" for record in self
+        })
+
+    def action_reset_to_draft(self):
+        """Restablecer a borrador con validaciones"""
+        if any(record.state == 'closed' for record in self):
+            raise UserError("No se puede restablecer a borrador una caja cerrada.")
+
+        # Restablecer a 'Borrador' si se vuelve a draft
+        self.write({
+            'state': 'draft',
+            'name': 'Borrador'
+        })
+        self._message_log_batch(bodies={
+            record.id: f"{record._get_cash_box_label()} restablecida a borrador" for record in self
+        })
+        
+    def action_recalculate_balances(self):
+        """Método para recalcular todos los saldos de las líneas"""
+        for record in self:
+            if record.state == 'closed':
+                raise UserError("No se pueden recalcular saldos en una caja cerrada.")
+            
+        self._recompute_line_balances()
+        return True
+
+    def action_process_posting_queue(self):
+        """Contabilizar de inmediato los movimientos en cola, incluidos los fallidos"""
+        lines = self.line_ids.filtered(lambda l: l.posting_state in ('pending', 'failed'))
+        lines._process_posting_queue()
+        return True
+
+    def action_export_xlsx(self):
+        """Descargar en Excel los movimientos de las cajas seleccionadas"""
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/cash_box/export_xlsx?model={self._name}&ids={','.join(map(str, self.ids))}",
+            'target': 'self',
+        }
+
+    def _recompute_line_balances(self):
+        """Recalcular en lote los saldos de todas las líneas de las cajas"""
+        lines = self.line_ids
+        self.env.add_to_compute(lines._fields['balance'], lines)
+        lines._recompute_recordset(['balance'])
+
+    # ========== RESTRICCIONES DE ELIMINACIÓN ==========
+    
+    def unlink(self):
+        """Prevenir eliminación de cajas abiertas o cerradas"""
+        for record in self:
+            if record.state in ('open', 'closed'):
+                raise UserError(
+                    f"No se puede eliminar la caja {record.name} en estado '{record.state}'. "
+                    "Solo se pueden eliminar cajas en estado 'borrador' o 'cancelada'."
+                )
+        self._invalidate_dashboard_stats()
+        self.env['cash.box.summary'].sudo()._remove_boxes(self)
+        return super(CashBoxMixin, self).unlink()
+
+
+class CashBoxLineMixin(models.AbstractModel):
+    """Motor común de los movimientos: saldos, asientos, pagos y cola de contabilización
+
+    Los modelos concretos definen el Many2one a su caja, indicado en ``_cash_box_field``.
+    """
+    _name = 'cash.box.line.mixin'
+    _description = 'Motor de Movimientos de Caja'
+    # Mismo orden en que se acumula el saldo (ver _get_balance_sort_key)
+    _order = 'sequence, id'
+
+    # Campo Many2one de la línea hacia su caja
+    _cash_box_field = None
+
+    # Campos de control
+    sequence = fields.Integer(string='Secuencia', default=10)
+    
+    # Información básica
+    date = fields.Date(
+        string='Fecha',
+        required=True,
+        index=True,
+        default=fields.Date.context_today
+    )
+    area_id = fields.Many2one(
+        'hr.department',
+        string='Área',
+        check_company=True
+    )
+    
+    # Tipo de movimiento
+    line_type = fields.Selection([
+        ('income', 'Ingreso'),
+        ('expense', 'Egreso')
+    ], string='Tipo', required=True, default='expense')
+    
+    # Documento
+    document_type = fields.Selection([
+        ('factura', 'Factura'),
+        ('boleta', 'Boleta'),
+        ('recibo', 'Recibo'),
+        ('ticket', 'Ticket'),
+        ('otros', 'Otros')
+    ], string='Tipo Documento')
+    document_number = fields.Char(string='Número Documento')
+    
+    # Proveedor/Beneficiario
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Proveedor/Beneficiario'
+    )
+    partner_name = fields.Char(
+        string='Nombre Proveedor',
+        compute='_compute_partner_name',
+        store=True,
+        readonly=False
+    )
+    
+    # Descripción y monto
+    description = fields.Text(string='Descripción', required=True)
+    amount = fields.Float(string='Monto', required=True)
+    
+    # Saldo acumulado
+    balance = fields.Float(
+        string='Saldo',
+        compute='_compute_balance',
+        store=True
+    )
+    
+    # Campos adicionales para control
+    notes = fields.Text(string='Observaciones')
+    attachment_ids = fields.Many2many(
+        'ir.attachment',
+        string='Adjuntos'
+    )
+    
+    # Campos para integración contable
+    invoice_id = fields.Many2one(
+        'account.move',
+        string='Factura',
+        domain="[('move_type', 'in', ['out_invoice', 'in_invoice', 'out_refund', 'in_refund']), ('state', '=', 'posted'), ('payment_state', 'in', ['not_paid', 'partial']), ('company_id', '=', parent.company_id)]",
+        check_company=True,
+        help='Factura del sistema que se está pagando con esta línea'
+    )
+    
+    payment_id = fields.Many2one(
+        'account.payment',
+        string='Pago Generado',
+        readonly=True,
+        help='Pago generado en el sistema al registrar este movimiento'
+    )
+    
+    move_id = fields.Many2one(
+        'account.move',
+        string='Asiento Contable',
+        readonly=True,
+        help='Asiento contable generado para este movimiento'
+    )
+
+    move_line_id = fields.Many2one(
+        'account.move.line',
+        string='Apunte Contable',
+        readonly=True,
+        copy=False,
+        help='Apunte de contrapartida que registra este movimiento'
+    )
+
+    # Cola de contabilización diferida
+    posting_state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Contabilizado'),
+        ('failed', 'Error')
+    ], string='Estado de Contabilización', readonly=True, copy=False)
+    posting_queued_at = fields.Datetime(string='En Cola Desde', readonly=True, copy=False)
+    posting_attempts = fields.Integer(string='Intentos de Contabilización', readonly=True, copy=False)
+    posting_error = fields.Text(string='Error de Contabilización', readonly=True, copy=False)
+
+    def init(self):
+        if self._abstract:
+            return
+        # Lectura de las líneas de una caja en orden de saldo y desplazamiento de saldos
+        tools.create_index(
+            self.env.cr, f'{self._table}_{self._cash_box_field}_sequence_index',
+            self._table, [self._cash_box_field, 'sequence', 'id'],
+        )
+        # Cola de contabilización: solo las líneas pendientes, en orden de llegada
+        tools.create_index(
+            self.env.cr, f'{self._table}_posting_queue_index',
+            self._table, ['posting_queued_at', 'id'],
+            where="posting_state = 'pending'",
+        )
+
+    # ========== VALIDACIONES PARA LÍNEAS ==========
+    
+    @api.constrains('amount')
+    def _check_amount(self):
+        for line in self:
+            if line.amount <= 0:
+                raise ValidationError("El monto debe ser mayor a cero.")
+
+    @api.constrains(lambda self: [self._cash_box_field])
+    def _check_cash_state(self):
+        for line in self:
+            if line._get_cash_box().state == 'closed':
+                raise ValidationError(
+                    "No se pueden agregar o modificar movimientos en una caja cerrada."
+                )
+
+    # ========== MÉTODOS COMPUTADOS ==========
+
+    @api.depends('partner_id')
+    def _compute_partner_name(self):
+        for line in self:
+            if line.partner_id:
+                line.partner_name = line.partner_id.name
+            elif not line.partner_name:
+                line.partner_name = ''
+
+    @api.depends(lambda self: [
+        self._cash_box_field, f'{self._cash_box_field}.initial_amount', 'sequence', 'amount', 'line_type',
+    ])
+    def _compute_balance(self):
+        """Calcular saldos acumulados con una sola pasada ordenada por caja"""
+        self.filtered(lambda l: not l._get_cash_box()).balance = 0.0
+        to_compute = set(self)
+        for caja in self._get_cash_box():
+            balance = caja.initial_amount
+            for line in caja.line_ids.sorted(key=lambda l: l._get_balance_sort_key()):
+                if line.line_type == 'income':
+                    balance += line.amount
+                else:
+                    balance -= line.amount
+                if line in to_compute:
+                    line.balance = balance
+
+    def _get_cash_box(self):
+        """Caja (o cajas) de los movimientos"""
+        return self[self._cash_box_field]
+
+    def _get_balance_sort_key(self):
+        """Orden del saldo acumulado: secuencia y luego orden de creación"""
+        # Las líneas nuevas (sin id en base de datos) van al final de su secuencia
+        return (self.sequence, self._origin.id or float('inf'))
+
+    def _get_signed_amount(self):
+        """Monto con signo según el tipo de movimiento"""
+        self.ensure_one()
+        return self.amount if self.line_type == 'income' else -self.amount
+
+    def _shift_balances(self, shifts, exclude_ids=()):
+        """Desplazar en base de datos el saldo de las líneas desde una posición
+
+        Cada elemento de ``shifts`` es ``(caja_id, sequence, line_id, delta)``: se suma
+        ``delta`` al saldo de las líneas de la caja con posición (sequence, id) mayor
+        o igual a la indicada, sin tocar las líneas anteriores.
+        """
+        self.flush_model(['balance', 'sequence'])
+        for cash_id, sequence, line_id, delta in shifts:
+            if not delta:
+                continue
+            self.env.cr.execute(f"""
+                UPDATE {self._table}
+                   SET balance = balance + %s
+                 WHERE {self._cash_box_field} = %s
+                   AND (sequence, id) >= (%s, %s)
+                   AND id != ALL(%s::int[])
+            """, (delta, cash_id, sequence, line_id, list(exclude_ids)))
+        self.invalidate_model(['balance'], flush=False)
+
+    def _seed_balances(self):
+        """Fijar en base de datos el saldo de líneas recién creadas sin recorrer su caja
+
+        Cada línea toma el saldo guardado de la línea previa que ya existía (una
+        consulta indexada), o el monto inicial de la caja, más los montos de las líneas
+        nuevas hasta ella inclusive. Debe ejecutarse antes de desplazar los saldos de
+        las líneas existentes.
+        """
+        if not self:
+            return
+        box_field = self._cash_box_field
+        boxes_table = self.env[self._fields[box_field].comodel_name]._table
+        line_ids, cumulative = [], []
+        running = defaultdict(float)
+        for line in self.sorted(lambda l: (l._get_cash_box().id, l._get_balance_sort_key())):
+            running[line._get_cash_box().id] += line._get_signed_amount()
+            line_ids.append(line.id)
+            cumulative.append(running[line._get_cash_box().id])
+
+        self.flush_model([box_field, 'sequence', 'balance'])
+        self.env.cr.execute(f"""
+            UPDATE {self._table} AS line
+               SET balance = COALESCE((
+                       SELECT prev.balance
+                         FROM {self._table} AS prev
+                        WHERE prev.{box_field} = line.{box_field}
+                          AND (prev.sequence, prev.id) < (line.sequence, line.id)
+                          AND prev.id != ALL(%s::int[])
+                     ORDER BY prev.sequence DESC, prev.id DESC
+                        LIMIT 1
+                   ), box.initial_amount) + new.cumulative
+              FROM unnest(%s::int[], %s::float8[]) AS new(id, cumulative), {boxes_table} AS box
+             WHERE line.id = new.id
+               AND box.id = line.{box_field}
+        """, (line_ids, line_ids, cumulative))
+        self.invalidate_recordset(['balance'], flush=False)
+
+    @api.onchange('partner_id')
+    def _onchange_partner_id(self):
+        if self.partner_id:
+            self.partner_name = self.partner_id.name
+    
+    @api.onchange('invoice_id')
+    def _onchange_invoice_id(self):
+        """Autocompletar información de la factura"""
+        if self.invoice_id:
+            self.partner_id = self.invoice_id.partner_id
+            self.amount = self.invoice_id.amount_residual
+            self.document_type = 'factura' if self.invoice_id.move_type in ['out_invoice', 'in_invoice'] else 'boleta'
+            self.document_number = self.invoice_id.name
+            self.description = f"Pago de {self.invoice_id.name} - {self.invoice_id.partner_id.name}"
+            self.line_type = 'expense'
+    
+    def _get_counterpart_account(self):
+        """Cuenta de contrapartida del movimiento según su tipo y proveedor/cliente"""
+        self.ensure_one()
+        if self.partner_id:
+            if self.line_type == 'expense':
+                # Para gastos con proveedor, usar cuenta por pagar
+                counterpart_account = self.partner_id.property_account_payable_id
+            else:
+                # Para ingresos con cliente, usar cuenta por cobrar
+                counterpart_account = self.partner_id.property_account_receivable_id
+        else:
+            # Sin proveedor/cliente, usar la cuenta transitoria de la compañía
+            counterpart_account = self._get_cash_box().company_id.account_journal_suspense_account_id
+
+        if not counterpart_account:
+            raise UserError("No se pudo determinar la cuenta de contrapartida para el movimiento.")
+        return counterpart_account
+
+    def _prepare_line_move_vals(self):
+        """Preparar los valores del asiento contable del movimiento"""
+        self.ensure_one()
+        caja = self._get_cash_box()
+        
+        # Obtener cuenta de caja
+        cash_account = caja.journal_id.default_account_id
+        if not cash_account:
+            raise UserError(f"El diario {caja.journal_id.name} no tiene una cuenta por defecto configurada.")
+        
+        # Determinar cuenta de contrapartida
+        counterpart_account = self._get_counterpart_account()
+        
+        # Crear líneas del asiento
+        line_vals = []
+        if self.line_type == 'expense':
+            # Egreso: Crédito en caja, Débito en gasto/proveedor
+            line_vals = [
+                (0, 0, {
+                    'name': self.description or 'Egreso de caja',
+                    'account_id': counterpart_account.id,
+                    'debit': self.amount,
+                    'credit': 0.0,
+                    'partner_id': self.partner_id.id if self.partner_id else False,
+                }),
+                (0, 0, {
+                    'name': self.description or 'Egreso de caja',
+                    'account_id': cash_account.id,
+                    'debit': 0.0,
+                    'credit': self.amount,
+                    'partner_id': False,
+                }),
+            ]
+        else:
+            # Ingreso: Débito en caja, Crédito en ingreso/cliente
+            line_vals = [
+                (0, 0, {
+                    'name': self.description or 'Ingreso de caja',
+                    'account_id': cash_account.id,
+                    'debit': self.amount,
+                    'credit': 0.0,
+                    'partner_id': False,
+                }),
+                (0, 0, {
+                    'name': self.description or 'Ingreso de caja',
+                    'account_id': counterpart_account.id,
+                    'debit': 0.0,
+                    'credit': self.amount,
+                    'partner_id': self.partner_id.id if self.partner_id else False,
+                }),
+            ]
+        
+        # Crear asiento
+        move_vals = {
+            'journal_id': caja.journal_id.id,
+            'date': self.date,
+            'ref': f'{caja.name} - {self.description[:50] if self.description else "Movimiento"}',
+            'line_ids': line_vals,
+        }
+        return move_vals
+
+    def _create_line_moves(self):
+        """Crear y publicar en lote los asientos contables de los movimientos"""
+        lines = self.filtered(lambda l: l._get_cash_box().state == 'open' and not l.move_id)
+        if not lines:
+            return self.env['account.move']
+
+        moves = self.env['account.move'].create([line._prepare_line_move_vals() for line in lines])
+        moves.action_post()
+        for line, move in zip(lines, moves):
+            cash_account = line._get_cash_box().journal_id.default_account_id
+            line.write({
+                'move_id': move.id,
+                'move_line_id': move.line_ids.filtered(lambda ml: ml.account_id != cash_account)[:1].id,
+            })
+        return moves
+
+    def _split_posting_groups(self):
+        """Separar los movimientos en grupos que se contabilizan en un mismo asiento"""
+        groups = defaultdict(lambda: self.browse())
+        for line in self:
+            granularity = line._get_cash_box().posting_granularity
+            if line.invoice_id or granularity == 'line':
+                key = ('line', line.id)
+            elif granularity == 'day':
+                key = (line._get_cash_box().id, line.date)
+            else:
+                key = (line._get_cash_box().id, False)
+            groups[key] |= line
+        return list(groups.values())
+
+    def _prepare_consolidated_move_vals(self):
+        """Preparar un único asiento para movimientos de una misma caja y periodo"""
+        caja = self._get_cash_box()
+        caja.ensure_one()
+
+        cash_account = caja.journal_id.default_account_id
+        if not cash_account:
+            raise UserError(f"El diario {caja.journal_id.name} no tiene una cuenta por defecto configurada.")
+
+        if caja.posting_granularity == 'day':
+            label = f'Movimientos de caja del {self[0].date}'
+        else:
+            label = 'Movimientos de caja al cierre'
+
+        # Una línea de contrapartida por cuenta y proveedor/cliente (saldo deudor positivo)
+        currency = caja.company_id.currency_id
+        counterparts = defaultdict(float)
+        for line in self:
+            counterparts[line._get_counterpart_account().id, line.partner_id.id] -= line._get_signed_amount()
+
+        line_vals = []
+        cash_balance = 0.0
+        for (account_id, partner_id), balance in counterparts.items():
+            balance = currency.round(balance)
+            cash_balance -= balance
+            line_vals.append((0, 0, {
+                'name': label,
+                'account_id': account_id,
+                'debit': max(balance, 0.0),
+                'credit': max(-balance, 0.0),
+                'partner_id': partner_id,
+            }))
+        # Entrada o salida neta de efectivo del periodo
+        line_vals.append((0, 0, {
+            'name': label,
+            'account_id': cash_account.id,
+            'debit': max(cash_balance, 0.0),
+            'credit': max(-cash_balance, 0.0),
+            'partner_id': False,
+        }))
+
+        return {
+            'journal_id': caja.journal_id.id,
+            'date': max(self.mapped('date')),
+            'ref': f'{caja.name} - {label}',
+            'line_ids': line_vals,
+        }
+
+    def _create_consolidated_moves(self):
+        """Crear un asiento por caja y periodo (día o cierre) y enlazar cada movimiento a su apunte"""
+        lines = self.filtered(lambda l: l._get_cash_box().state == 'open' and not l.move_id)
+        groups = lines._split_posting_groups()
+        if not groups:
+            return self.env['account.move']
+
+        moves = self.env['account.move'].create([group._prepare_consolidated_move_vals() for group in groups])
+        moves.action_post()
+        for group, move in zip(groups, moves):
+            cash_account = group._get_cash_box().journal_id.default_account_id
+            move_lines = {
+                (ml.account_id.id, ml.partner_id.id): ml
+                for ml in move.line_ids if ml.account_id != cash_account
+            }
+            by_move_line = defaultdict(lambda: self.browse())
+            for line in group:
+                by_move_line[move_lines.get((line._get_counterpart_account().id, line.partner_id.id))] |= line
+            for move_line, linked in by_move_line.items():
+                linked.write({'move_id': move.id, 'move_line_id': move_line.id if move_line else False})
+        return moves
+
+    def _create_line_move(self):
+        """Crear asiento contable para el movimiento"""
+        self.ensure_one()
+        
+        if self._get_cash_box().state != 'open':
+            return False
+        if not self.move_id:
+            self._create_line_moves()
+        return self.move_id
+    
+    def _prepare_payment_vals(self):
+        """Preparar los valores de un pago único para las facturas enlazadas a los movimientos"""
+        line = self[0]
+        # Determinar tipo de pago
+        outbound = line.invoice_id.move_type in ['in_invoice', 'out_refund']
+        return {
+            'payment_type': 'outbound' if outbound else 'inbound',
+            'partner_type': 'supplier' if outbound else 'customer',
+            'partner_id': line.invoice_id.partner_id.id,
+            'amount': sum(self.mapped('amount')),
+            'date': line.date,
+            'journal_id': line._get_cash_box().journal_id.id,
+            'memo': f'{line._get_cash_box().name} - Pago {", ".join(self.invoice_id.mapped("name"))}',
+        }
+
+    def _split_payment_groups(self):
+        """Separar los movimientos en los pagos a generar
+
+        Con ``group_invoice_payments`` en el contexto se genera un pago por caja,
+        empresa, tipo de pago y fecha; si no, un pago por movimiento.
+        """
+        if not self.env.context.get('group_invoice_payments'):
+            return list(self)
+        groups = defaultdict(lambda: self.browse())
+        for line in self:
+            outbound = line.invoice_id.move_type in ['in_invoice', 'out_refund']
+            groups[line._get_cash_box().id, line.invoice_id.partner_id.id, outbound, line.date] |= line
+        return list(groups.values())
+
+    def _create_payments_for_invoices(self):
+        """Crear y publicar en lote los pagos de las facturas enlazadas y conciliarlos"""
+        lines = self.filtered(lambda l: l.invoice_id and not l.payment_id)
+        if not lines:
+            return self.env['account.payment']
+
+        groups = lines._split_payment_groups()
+        payments = self.env['account.payment'].create([group._prepare_payment_vals() for group in groups])
+        payments.action_post()
+        for group, payment in zip(groups, payments):
+            group.payment_id = payment
+
+        # Una sola búsqueda de los apuntes por cobrar/pagar abiertos; cada pago se
+        # concilia solo con las facturas de su grupo, por empresa y cuenta
+        posted = [(group, payment) for group, payment in zip(groups, payments) if payment.move_id]
+        if not posted:
+            return payments
+        open_lines = self.env['account.move.line'].search([
+            ('move_id', 'in', payments.move_id.ids + lines.invoice_id.ids),
+            ('account_id.account_type', 'in', ('asset_receivable', 'liability_payable')),
+            ('reconciled', '=', False),
+        ])
+        lines_by_move = open_lines.grouped('move_id')
+        empty = self.env['account.move.line']
+        for group, payment in posted:
+            to_reconcile = defaultdict(lambda: empty)
+            for move in payment.move_id | group.invoice_id:
+                for move_line in lines_by_move.get(move, empty):
+                    to_reconcile[move_line.partner_id.commercial_partner_id, move_line.account_id] |= move_line
+            for move_lines in to_reconcile.values():
+                if len(move_lines) > 1:
+                    move_lines.reconcile()
+        return payments
+
+    def _create_payment_for_invoice(self):
+        """Crear pago para factura enlazada"""
+        self.ensure_one()
+
+        if not self.invoice_id:
+            return False
+        if not self.payment_id:
+            self._create_payments_for_invoices()
+        return self.payment_id
+    
+    def _post_lines(self):
+        """Generar el pago (si hay factura) o el asiento contable de los movimientos"""
+        invoice_lines = self.filtered('invoice_id')
+        invoice_lines._create_payments_for_invoices()
+        other_lines = self - invoice_lines
+        per_line = other_lines.filtered(lambda l: l._get_cash_box().posting_granularity == 'line')
+        per_line._create_line_moves()
+        (other_lines - per_line)._create_consolidated_moves()
+
+    def _process_posting_queue(self, max_attempts=0):
+        """Contabilizar movimientos en cola: todo el lote junto y, si falla, asiento por asiento
+
+        Los movimientos que fallan quedan pendientes para un nuevo intento, o con
+        error si alcanzan ``max_attempts`` intentos (0 = sin límite).
+        """
+        if not self:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self._post_lines()
+        except Exception:
+            for group in self._split_posting_groups():
+                try:
+                    with self.env.cr.savepoint():
+                        group._post_lines()
+                except Exception as e:
+                    _logger.warning("Error al contabilizar los movimientos %s: %s", group.ids, e)
+                    for line in group:
+                        attempts = line.posting_attempts + 1
+                        line.write({
+                            'posting_state': 'failed' if max_attempts and attempts >= max_attempts else 'pending',
+                            'posting_attempts': attempts,
+                            'posting_error': str(e),
+                        })
+        self.filtered(lambda l: l.move_id or l.payment_id).write({
+            'posting_state': 'done',
+            'posting_error': False,
+        })
+
+    @api.model
+    def _cron_process_posting_queue(self, batch_size=200, max_attempts=5):
+        """Vaciar por lotes la cola de contabilización de las cajas abiertas"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        today = fields.Date.context_today(self)
+        box_field = self._cash_box_field
+        processed_ids = []
+        while True:
+            # Los asientos diarios esperan a que termine el día; los de cierre, al cierre
+            domain = [
+                ('posting_state', '=', 'pending'),
+                (f'{box_field}.state', '=', 'open'),
+                ('id', 'not in', processed_ids),
+                '|', '|',
+                ('invoice_id', '!=', False),
+                (f'{box_field}.posting_granularity', '=', 'line'),
+                '&', (f'{box_field}.posting_granularity', '=', 'day'), ('date', '<', today),
+            ]
+            lines = self.search(domain, order='posting_queued_at, id', limit=batch_size)
+            if not lines:
+                break
+            # Completar los días del lote para no partir un asiento diario
+            daily = lines.filtered(lambda l: not l.invoice_id and l._get_cash_box().posting_granularity == 'day')
+            if daily:
+                lines |= self.search(domain + [
+                    (box_field, 'in', daily._get_cash_box().ids),
+                    ('date', 'in', daily.mapped('date')),
+                    ('id', 'not in', lines.ids),
+                ])
+            processed_ids += lines.ids
+            lines._process_posting_queue(max_attempts=max_attempts)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create para generar asientos automáticamente en lote"""
+        lines = super(CashBoxLineMixin, self).create(vals_list)
+
+        # El saldo de las nuevas parte del de su predecesora; no se recorre la caja
+        self.env.remove_to_compute(self._fields['balance'], lines)
+        lines._seed_balances()
+        # Desplazar solo los saldos de las líneas posteriores a las nuevas
+        lines._shift_balances(
+            [(line._get_cash_box().id, line.sequence, line.id, line._get_signed_amount()) for line in lines],
+            exclude_ids=lines.ids,
+        )
+
+        lines._get_cash_box()._on_cash_box_change()
+
+        # Si la caja está abierta, crear movimientos contables
+        open_lines = lines.filtered(lambda l: l._get_cash_box().state == 'open')
+        # Con contabilización diferida o agrupada solo se encolan para el proceso programado
+        deferred_lines = open_lines.filtered(lambda l: l._get_cash_box().deferred_posting or (
+            l._get_cash_box().posting_granularity != 'line' and not l.invoice_id))
+        if deferred_lines:
+            deferred_lines.write({
+                'posting_state': 'pending',
+                'posting_queued_at': fields.Datetime.now(),
+            })
+        # Con factura asociada se crea un pago; sino, un asiento contable simple
+        (open_lines - deferred_lines)._post_lines()
+
+        return lines
+
+    def write(self, vals):
+        """Actualizar saldos solo desde la línea modificada en adelante"""
+        cajas = self._get_cash_box()
+        if self._cash_box_field in vals or 'sequence' in vals:
+            # Un cambio de caja u orden exige recalcular las cajas afectadas
+            res = super(CashBoxLineMixin, self).write(vals)
+            (cajas | self._get_cash_box())._recompute_line_balances()
+        elif 'amount' in vals or 'line_type' in vals:
+            self.flush_model(['balance'])
+            previous = {line.id: line._get_signed_amount() for line in self}
+            res = super(CashBoxLineMixin, self).write(vals)
+
+            # Aplicar la diferencia en base de datos en lugar de recalcular la línea
+            self.env.remove_to_compute(self._fields['balance'], self)
+            self._shift_balances([
+                (line._get_cash_box().id, line.sequence, line.id, line._get_signed_amount() - previous[line.id])
+                for line in self
+            ])
+        elif 'date' in vals:
+            # La fecha no altera los saldos, pero sí el último movimiento del resumen
+            res = super(CashBoxLineMixin, self).write(vals)
+        else:
+            return super(CashBoxLineMixin, self).write(vals)
+
+        (cajas | self._get_cash_box())._on_cash_box_change()
+        return res
+
+    # ========== RESTRICCIONES DE ELIMINACIÓN PARA LÍNEAS ==========
+    
+    def unlink(self):
+        """Prevenir eliminación de líneas en cajas cerradas"""
+        for line in self:
+            if line._get_cash_box().state == 'closed':
+                raise UserError(
+                    f"No se pueden eliminar movimientos de la caja {line._get_cash_box().name} "
+                    "porque está cerrada."
+                )
+        shifts = [
+            (line._get_cash_box().id, line.sequence, line.id, -line._get_signed_amount())
+            for line in self
+        ]
+        cajas = self._get_cash_box()
+        res = super(CashBoxLineMixin, self).unlink()
+        self._shift_balances(shifts)
+        cajas._on_cash_box_change()
+        return res
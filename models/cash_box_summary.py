@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools
+
+# Modelos de caja resumidos en la tabla
+CASH_BOX_TYPES = [
+    ('petty.cash', 'Caja Chica'),
+    ('distribution.cash', 'Caja de Distribución'),
+    ('logistics.cash', 'Caja de Logística'),
+    ('cash.box', 'Caja Configurable'),
+]
+
+# Campos copiados tal cual desde la caja
+SUMMARY_BOX_FIELDS = [
+    'name', 'date', 'responsible_id', 'company_id', 'state',
+    'initial_amount', 'total_income', 'total_expense', 'current_balance',
+]
+
+
+class CashBoxSummary(models.Model):
+    _name = 'cash.box.summary'
+    _description = 'Resumen de Cajas'
+    _order = 'date desc, id desc'
+
+    res_model = fields.Selection(
+        CASH_BOX_TYPES,
+        string='Tipo de Caja',
+        required=True,
+        readonly=True
+    )
+    res_id = fields.Many2oneReference(
+        string='ID de Caja',
+        model_field='res_model',
+        required=True,
+        readonly=True
+    )
+    box_type_id = fields.Many2one(
+        'cash.box.type',
+        string='Tipo Configurado',
+        readonly=True,
+        help='Tipo de las cajas configurables (modelo cash.box)'
+    )
+    name = fields.Char(string='Número', readonly=True)
+    date = fields.Date(string='Fecha', readonly=True)
+    responsible_id = fields.Many2one(
+        'res.users',
+        string='Responsable',
+        readonly=True
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        readonly=True
+    )
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('open', 'Abierta'),
+        ('closed', 'Cerrada'),
+        ('cancelled', 'Cancelada')
+    ], string='Estado', readonly=True)
+
+    # Totales
+    initial_amount = fields.Float(string='Monto Inicial', readonly=True)
+    total_income = fields.Float(string='Total Ingresos', readonly=True)
+    total_expense = fields.Float(string='Total Egresos', readonly=True)
+    current_balance = fields.Float(string='Saldo Actual', readonly=True)
+    line_count = fields.Integer(string='Movimientos', readonly=True)
+    last_move_date = fields.Date(string='Último Movimiento', readonly=True)
+
+    _sql_constraints = [
+        ('res_model_res_id_uniq', 'unique(res_model, res_id)', 'Cada caja tiene un único resumen.'),
+    ]
+
+    def init(self):
+        # Regla de registro y dashboard: responsable + tipo + estado
+        tools.create_index(
+            self.env.cr, 'cash_box_summary_responsible_id_res_model_state_index',
+            self._table, ['responsible_id', 'res_model', 'state'],
+        )
+
+    @api.model
+    def _sync_boxes(self, boxes):
+        """Actualizar las filas del resumen de las cajas indicadas (de un mismo modelo)"""
+        boxes = boxes.exists()
+        if not boxes:
+            return
+        line_field = boxes._fields['line_ids']
+        line_stats = {
+            box.id: (count, last_date)
+            for box, count, last_date in self.env[line_field.comodel_name].sudo()._read_group(
+                [(line_field.inverse_name, 'in', boxes.ids)],
+                [line_field.inverse_name],
+                ['__count', 'date:max'],
+            )
+        }
+        existing = {
+            summary.res_id: summary
+            for summary in self.search([('res_model', '=', boxes._name), ('res_id', 'in', boxes.ids)])
+        }
+
+        to_create = []
+        box_fields = SUMMARY_BOX_FIELDS + (['box_type_id'] if 'box_type_id' in boxes._fields else [])
+        for values in boxes.sudo().read(box_fields, load=None):
+            box_id = values.pop('id')
+            count, last_date = line_stats.get(box_id, (0, False))
+            values.update({
+                'line_count': count,
+                'last_move_date': last_date,
+            })
+            if box_id in existing:
+                existing[box_id].write(values)
+            else:
+                to_create.append(dict(values, res_model=boxes._name, res_id=box_id))
+        if to_create:
+            self.create(to_create)
+
+    @api.model
+    def _remove_boxes(self, boxes):
+        """Eliminar las filas del resumen de las cajas indicadas"""
+        self.search([('res_model', '=', boxes._name), ('res_id', 'in', boxes.ids)]).unlink()
+
+    @api.model
+    def _rebuild(self, batch_size=1000):
+        """Reconstruir el resumen completo a partir de las cajas existentes"""
+        for res_model, _label in CASH_BOX_TYPES:
+            Box = self.env[res_model].sudo().with_context(active_test=False)
+            box_ids = Box.search([]).ids
+            self.search([('res_model', '=', res_model), ('res_id', 'not in', box_ids)]).unlink()
+            for start in range(0, len(box_ids), batch_size):
+                self._sync_boxes(Box.browse(box_ids[start:start + batch_size]))
+                self.env.invalidate_all()
+
+    def action_open_box(self):
+        """Abrir el formulario de la caja resumida"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+            'views': [(False, 'form')],
+            'target': 'current',
+        }
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, models
+
+
+class CashBoxType(models.Model):
+    _name = 'cash.box.type'
+    _description = 'Tipo de Caja'
+    _order = 'sequence, name'
+
+    name = fields.Char(string='Nombre', required=True, translate=True)
+    code = fields.Char(
+        string='Código',
+        required=True,
+        help='Identificador del tipo en el dashboard, por ejemplo "caja_viajes"'
+    )
+    sequence = fields.Integer(string='Secuencia', default=10)
+    active = fields.Boolean(string='Activo', default=True)
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        default=lambda self: self.env.company
+    )
+
+    # Numeración y contabilidad por defecto de las cajas del tipo
+    sequence_id = fields.Many2one(
+        'ir.sequence',
+        string='Secuencia de Numeración',
+        check_company=True,
+        help='Secuencia usada al abrir las cajas; sin secuencia se usa la genérica de cajas'
+    )
+    journal_id = fields.Many2one(
+        'account.journal',
+        string='Diario por Defecto',
+        domain="[('type', 'in', ['cash', 'bank'])]",
+        check_company=True
+    )
+    posting_granularity = fields.Selection([
+        ('line', 'Por Movimiento'),
+        ('day', 'Diario'),
+        ('close', 'Al Cierre')
+    ], string='Asientos Contables', required=True, default='line')
+
+    # Formato de impresión
+    report_id = fields.Many2one(
+        'ir.actions.report',
+        string='Formato de Reporte',
+        domain="[('model', '=', 'cash.box')]",
+        help='Reporte usado al imprimir las cajas del tipo; sin formato se usa el estándar'
+    )
+
+    box_count = fields.Integer(string='Cajas', compute='_compute_box_count')
+
+    _sql_constraints = [
+        ('code_uniq', 'unique(code)', 'El código del tipo de caja debe ser único.'),
+    ]
+
+    def _compute_box_count(self):
+        counts = dict(self.env['cash.box']._read_group(
+            [('box_type_id', 'in', self.ids)], ['box_type_id'], ['__count']))
+        for box_type in self:
+            box_type.box_count = counts.get(box_type, 0)
+
+    def action_view_boxes(self):
+        """Abrir las cajas del tipo"""
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('petty_cash.action_cash_box')
+        action['domain'] = [('box_type_id', '=', self.id)]
+        action['context'] = {'default_box_type_id': self.id}
+        return action
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import csv
+import io
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import date, datetime
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Tipo de caja -> (campo de la caja en la línea, modelo de líneas)
+CASH_LINE_MODELS = {
+    'petty': ('petty_cash_id', 'petty.cash.line'),
+    'distribution': ('distribution_cash_id', 'distribution.cash.line'),
+    'logistics': ('logistics_cash_id', 'logistics.cash.line'),
+    'box': ('cash_box_id', 'cash.box.line'),
+}
+
+LINE_TYPES = {
+    'ingreso': 'income',
+    'income': 'income',
+    'egreso': 'expense',
+    'expense': 'expense',
+}
+
+MAX_REPORTED_ERRORS = 50
+
+# Marca de un RUC compartido por varias empresas
+AMBIGUOUS_VAT = 'ambiguous'
+
+
+def _normalize(value):
+    """Normalizar textos para comparaciones: minúsculas y sin tildes"""
+    text = unicodedata.normalize('NFKD', str(value or '').strip().lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+class CashLineImportWizard(models.TransientModel):
+    _name = 'cash.line.import.wizard'
+    _description = 'Asistente para Importar Movimientos de Caja'
+
+    # Campo para el tipo de caja
+    cash_type = fields.Selection([
+        ('petty', 'Caja Chica'),
+        ('distribution', 'Caja de Distribución'),
+        ('logistics', 'Caja de Logística'),
+        ('box', 'Caja Configurable')
+    ], string='Tipo de Caja', required=True, default='petty')
+
+    # Campos para cada tipo de caja
+    petty_cash_id = fields.Many2one(
+        'petty.cash',
+        string='Caja Chica',
+        domain="[('state', 'in', ('draft', 'open'))]"
+    )
+
+    distribution_cash_id = fields.Many2one(
+        'distribution.cash',
+        string='Caja de Distribución',
+        domain="[('state', 'in', ('draft', 'open'))]"
+    )
+
+    logistics_cash_id = fields.Many2one(
+        'logistics.cash',
+        string='Caja de Logística',
+        domain="[('state', 'in', ('draft', 'open'))]"
+    )
+
+    cash_box_id = fields.Many2one(
+        'cash.box',
+        string='Caja Configurable',
+        domain="[('state', 'in', ('draft', 'open'))]"
+    )
+
+    # Archivo a importar
+    file = fields.Binary(
+        string='Archivo',
+        required=True,
+        attachment=True,
+        help='Archivo CSV o XLSX con las columnas: fecha, tipo, tipo_documento, '
+             'numero_documento, proveedor, ruc, area, descripcion, monto, observaciones'
+    )
+    filename = fields.Char(string='Nombre del Archivo')
+
+    batch_size = fields.Integer(
+        string='Tamaño de Lote',
+        default=1000,
+        required=True,
+        help='Cantidad de filas que se validan e insertan en cada lote'
+    )
+    skip_errors = fields.Boolean(
+        string='Omitir Filas con Errores',
+        help='Si está marcado, las filas inválidas se omiten y se importa el resto. '
+             'Si no, cualquier error cancela toda la importación.'
+    )
+
+    # Resultado de la importación
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Importado')
+    ], string='Estado', default='draft')
+    imported_count = fields.Integer(string='Filas Importadas', readonly=True)
+    error_count = fields.Integer(string='Filas con Errores', readonly=True)
+    duration = fields.Float(string='Duración (s)', readonly=True)
+    rows_per_second = fields.Float(string='Filas por Segundo', readonly=True)
+    error_log = fields.Text(string='Errores', readonly=True)
+
+    @api.constrains('batch_size')
+    def _check_batch_size(self):
+        for wizard in self:
+            if wizard.batch_size <= 0:
+                raise UserError("El tamaño de lote debe ser mayor a cero.")
+
+    # ========== LECTURA DEL ARCHIVO ==========
+
+    def _open_file(self):
+        """Abrir el archivo como flujo binario, leyendo del filestore cuando es posible"""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(base64.b64decode(self.file))
+
+    def _iter_rows(self, stream):
+        """Iterar las filas del archivo como diccionarios, una a la vez"""
+        if (self.filename or '').lower().endswith('.xlsx'):
+            yield from self._iter_xlsx_rows(stream)
+        else:
+            yield from self._iter_csv_rows(stream)
+
+    def _iter_csv_rows(self, stream):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        header = [_normalize(h).replace(' ', '_') for h in next(reader, [])]
+        for values in reader:
+            if any(v.strip() for v in values):
+                yield dict(zip(header, values))
+
+    def _iter_xlsx_rows(self, stream):
+        if openpyxl is None:
+            raise UserError("Se requiere la librería openpyxl para importar archivos XLSX.")
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_normalize(h).replace(' ', '_') for h in next(rows, ())]
+            for values in rows:
+                if any(v not in (None, '') for v in values):
+                    yield dict(zip(header, values))
+        finally:
+            workbook.close()
+
+    # ========== VALIDACIÓN E INSERCIÓN ==========
+
+    def _get_cash(self):
+        """Obtener la caja seleccionada y su modelo de líneas"""
+        self.ensure_one()
+        field_name, line_model = CASH_LINE_MODELS[self.cash_type]
+        cash = self[field_name]
+        if not cash:
+            raise UserError("Debe seleccionar la caja en la que se importarán los movimientos.")
+        if cash.state not in ('draft', 'open'):
+            raise UserError(f"No se pueden importar movimientos en la caja {cash.name}.")
+        return cash, field_name, self.env[line_model]
+
+    def _prepare_lookups(self, cash, Line):
+        """Construir los diccionarios de búsqueda usados por todas las filas"""
+        departments = self.env['hr.department'].search_read(
+            [('company_id', 'in', (cash.company_id.id, False))], ['name'])
+        document_types = {}
+        for key, label in Line._fields['document_type'].selection:
+            document_types[_normalize(key)] = key
+            document_types[_normalize(label)] = key
+        return {
+            'departments': {_normalize(d['name']): d['id'] for d in departments},
+            'document_types': document_types,
+            'partners_by_vat': {},
+            'partners_by_name': {},
+        }
+
+    def _update_partner_lookups(self, rows, lookups):
+        """Resolver con dos búsquedas los proveedores aún no conocidos del lote
+
+        Primero se busca por RUC; las filas cuyo RUC no corresponde a ninguna
+        empresa se buscan por nombre.
+        """
+        by_vat, by_name = lookups['partners_by_vat'], lookups['partners_by_name']
+        Partner = self.env['res.partner']
+
+        vats = {str(row.get('ruc') or '').strip() for _row_number, row in rows} - by_vat.keys() - {''}
+        if vats:
+            # Con varios contactos por RUC se toma su empresa comercial; si el RUC
+            # corresponde a varias empresas comerciales, es ambiguo
+            candidates = defaultdict(list)
+            for partner in Partner.search_read(
+                    [('vat', 'in', list(vats))], ['vat', 'name', 'commercial_partner_id'], load=None):
+                candidates[partner['vat']].append(partner)
+            for vat, partners in candidates.items():
+                commercial = [p for p in partners if p['commercial_partner_id'] == p['id']]
+                if len(commercial) == 1:
+                    by_vat[vat] = (commercial[0]['id'], commercial[0]['name'])
+                elif len(commercial) > 1 or len({p['commercial_partner_id'] for p in partners}) > 1:
+                    by_vat[vat] = AMBIGUOUS_VAT
+                else:
+                    by_vat[vat] = (partners[0]['id'], partners[0]['name'])
+            # Recordar también los que no existen para no volver a buscarlos
+            for vat in vats - by_vat.keys():
+                by_vat[vat] = False
+
+        names = set()
+        for _row_number, row in rows:
+            vat = str(row.get('ruc') or '').strip()
+            name = str(row.get('proveedor') or '').strip()
+            if name and not by_vat.get(vat) and _normalize(name) not in by_name:
+                names.add(name)
+        if names:
+            for partner in Partner.search_read([('name', 'in', list(names))], ['name']):
+                by_name.setdefault(_normalize(partner['name']), (partner['id'], partner['name']))
+            for name in names:
+                by_name.setdefault(_normalize(name), False)
+
+    def _parse_date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        value = str(value or '').strip()
+        if not value:
+            return fields.Date.context_today(self)
+        for fmt in ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        raise ValueError(f"fecha '{value}' no válida (use DD/MM/AAAA)")
+
+    def _parse_amount(self, value):
+        """Convertir el monto aceptando coma o punto decimal
+
+        El separador decimal es el último de los dos que aparece; el otro se toma como
+        separador de miles. Un único separador seguido de exactamente tres dígitos
+        (``1.234`` o ``1,234``) es ambiguo y se rechaza.
+        """
+        if isinstance(value, (int, float)):
+            amount = float(value)
+        else:
+            text = str(value or '').strip().replace(' ', '')
+            decimal_sep = max(('.', ','), key=text.rfind)
+            if decimal_sep not in text:
+                number = text
+            else:
+                thousands_sep = ',' if decimal_sep == '.' else '.'
+                integer, _sep, decimals = text.rpartition(decimal_sep)
+                if decimal_sep in integer:
+                    if thousands_sep in integer:
+                        raise ValueError(f"monto '{value}' no válido")
+                    # Separador repetido sin otro distinto: son separadores de miles
+                    integer, decimals = text, ''
+                    thousands_sep = decimal_sep
+                elif thousands_sep not in integer and len(decimals) == 3:
+                    raise ValueError(
+                        f"monto '{value}' ambiguo: no se sabe si '{decimal_sep}' separa "
+                        "miles o decimales"
+                    )
+                number = integer.replace(thousands_sep, '') + ('.' + decimals if decimals else '')
+            try:
+                amount = float(number)
+            except ValueError:
+                raise ValueError(f"monto '{value}' no válido")
+        if amount <= 0:
+            raise ValueError("el monto debe ser mayor a cero")
+        return amount
+
+    def _prepare_line_vals(self, row, field_name, cash, lookups):
+        """Convertir una fila del archivo en valores de línea de caja"""
+        description = str(row.get('descripcion') or '').strip()
+        if not description:
+            raise ValueError("la descripción es obligatoria")
+
+        line_type = LINE_TYPES.get(_normalize(row.get('tipo')) or 'egreso')
+        if not line_type:
+            raise ValueError(f"tipo '{row.get('tipo')}' no válido (use Ingreso o Egreso)")
+
+        vals = {
+            field_name: cash.id,
+            'date': self._parse_date(row.get('fecha')),
+            'line_type': line_type,
+            'description': description,
+            'amount': self._parse_amount(row.get('monto')),
+            'document_number': str(row.get('numero_documento') or '').strip() or False,
+            'notes': str(row.get('observaciones') or '').strip() or False,
+        }
+
+        document_type = _normalize(row.get('tipo_documento'))
+        if document_type:
+            if document_type not in lookups['document_types']:
+                raise ValueError(f"tipo de documento '{row.get('tipo_documento')}' no válido")
+            vals['document_type'] = lookups['document_types'][document_type]
+
+        area = _normalize(row.get('area'))
+        if area:
+            if area not in lookups['departments']:
+                raise ValueError(f"área '{row.get('area')}' no encontrada")
+            vals['area_id'] = lookups['departments'][area]
+
+        vat = str(row.get('ruc') or '').strip()
+        name = str(row.get('proveedor') or '').strip()
+        partner = vat and lookups['partners_by_vat'].get(vat)
+        if partner == AMBIGUOUS_VAT:
+            raise ValueError(f"RUC '{vat}' ambiguo: corresponde a varias empresas")
+        partner = partner or lookups['partners_by_name'].get(_normalize(name))
+        if partner:
+            vals['partner_id'] = partner[0]
+            vals['partner_name'] = partner[1]
+        elif name:
+            # Proveedor no registrado: se conserva solo el nombre
+            vals['partner_name'] = name
+        return vals
+
+    def _import_batch(self, rows, field_name, cash, Line, lookups, errors, create=True):
+        """Validar un lote de filas e insertar las válidas con una sola creación
+
+        Con ``create=False`` solo se validan las filas y se acumulan sus errores.
+        """
+        self._update_partner_lookups(rows, lookups)
+        vals_list = []
+        for row_number, row in rows:
+            try:
+                vals_list.append(self._prepare_line_vals(row, field_name, cash, lookups))
+            except ValueError as e:
+                errors.append(f"Fila {row_number}: {e}")
+        if vals_list and create:
+            Line.create(vals_list)
+            # Liberar la caché del ORM para mantener la memoria constante
+            self.env.invalidate_all()
+        return len(vals_list)
+
+    def _process_file(self, field_name, cash, Line, lookups, errors, create=True):
+        """Recorrer el archivo por lotes y devolver la cantidad de filas válidas"""
+        batch_size = self.batch_size
+        count = 0
+        batch = []
+        with self._open_file() as stream:
+            for row_number, row in enumerate(self._iter_rows(stream), start=2):
+                batch.append((row_number, row))
+                if len(batch) >= batch_size:
+                    count += self._import_batch(batch, field_name, cash, Line, lookups, errors, create)
+                    batch = []
+            if batch:
+                count += self._import_batch(batch, field_name, cash, Line, lookups, errors, create)
+        return count
+
+    def action_import(self):
+        """Importar los movimientos del archivo por lotes
+
+        Si no se omiten errores, todo el archivo se valida antes de crear ningún
+        movimiento y cualquier error cancela la importación.
+        """
+        self.ensure_one()
+        cash, field_name, Line = self._get_cash()
+        lookups = self._prepare_lookups(cash, Line)
+
+        start = time.perf_counter()
+        errors = []
+        if not self.skip_errors:
+            self._process_file(field_name, cash, Line, lookups, errors, create=False)
+            if errors:
+                raise UserError(
+                    "No se importó ningún movimiento. Errores encontrados:\n"
+                    + "\n".join(errors[:MAX_REPORTED_ERRORS])
+                )
+        imported = self._process_file(field_name, cash, Line, lookups, errors)
+        duration = time.perf_counter() - start
+
+        self.write({
+            'state': 'done',
+            'imported_count': imported,
+            'error_count': len(errors),
+            'duration': duration,
+            'rows_per_second': (imported + len(errors)) / duration if duration else 0.0,
+            'error_log': "\n".join(errors[:MAX_REPORTED_ERRORS]) or False,
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'views': [(False, 'form')],
+            'target': 'new',
+        }
@@ -1,7 +1,96 @@
-from odoo import models, fields, api
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError, UserError
 from datetime import date
 
+from .ir_actions_report import report_cache_name
+
+# Números básicos
+UNIDADES = ["", "UNO", "DOS", "TRES", "CUATRO", "CINCO", "SEIS", "SIETE", "OCHO", "NUEVE"]
+DECENAS = ["", "", "VEINTE", "TREINTA", "CUARENTA", "CINCUENTA", "SESENTA", "SETENTA", "OCHENTA", "NOVENTA"]
+ESPECIALES = ["DIEZ", "ONCE", "DOCE", "TRECE", "CATORCE", "QUINCE", "DIECISÉIS", "DIECISIETE", "DIECIOCHO", "DIECINUEVE"]
+CENTENAS = ["", "CIENTO", "DOSCIENTOS", "TRESCIENTOS", "CUATROCIENTOS", "QUINIENTOS", "SEISCIENTOS", "SETECIENTOS", "OCHOCIENTOS", "NOVECIENTOS"]
+
+# Límite de los montos convertibles a letras: un millón de billones
+MAX_AMOUNT_IN_WORDS = 10 ** 18
+
+# Moneda en letras por código ISO
+CURRENCY_WORDS = {
+    'PEN': 'SOLES',
+    'USD': 'DÓLARES',
+    'EUR': 'EUROS',
+}
+
+
+@lru_cache(maxsize=1000)
+def convertir_hasta_999(num):
+    """Convertir a palabras un número entre 0 y 999 (memorizado: solo hay mil valores)"""
+    if num == 0:
+        return ""
+    elif num == 100:
+        return "CIEN"
+    elif num < 10:
+        return UNIDADES[num]
+    elif num < 20:
+        return ESPECIALES[num - 10]
+    elif num < 100:
+        d = num // 10
+        u = num % 10
+        if u == 0:
+            return DECENAS[d]
+        else:
+            return DECENAS[d] + " Y " + UNIDADES[u]
+    else:
+        c = num // 100
+        resto = num % 100
+        resultado = CENTENAS[c]
+        if resto > 0:
+            resultado += " " + convertir_hasta_999(resto)
+        return resultado
+
+
+def convertir_hasta_999999(num):
+    """Convertir a palabras un número entre 0 y 999 999"""
+    miles, resto = divmod(num, 1000)
+    if miles == 0:
+        return convertir_hasta_999(resto)
+    palabras = "MIL" if miles == 1 else convertir_hasta_999(miles) + " MIL"
+    if resto > 0:
+        palabras += " " + convertir_hasta_999(resto)
+    return palabras
+
+
+def amount_to_words(amount, currency_words='SOLES'):
+    """Convertir un monto a palabras en español, con los céntimos redondeados exactamente
+
+    Se admiten montos hasta 999 999 BILLONES (escala larga: un billón es un millón
+    de millones); uno mayor se rechaza con un ``ValidationError``.
+    """
+    value = Decimal(str(amount or 0.0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    amount = int(value)
+    decimals = int((value - amount) * 100)
+    if amount >= MAX_AMOUNT_IN_WORDS:
+        raise ValidationError(f"El monto {amount} es demasiado grande para expresarse en letras.")
+
+    billones, resto = divmod(amount, 10 ** 12)
+    millones, unidades = divmod(resto, 10 ** 6)
+    partes = []
+    if billones:
+        partes.append("UN BILLÓN" if billones == 1 else convertir_hasta_999999(billones) + " BILLONES")
+    if millones:
+        partes.append("UN MILLÓN" if millones == 1 else convertir_hasta_999999(millones) + " MILLONES")
+    if unidades:
+        partes.append(convertir_hasta_999999(unidades))
+    palabras = " ".join(partes) or "CERO"
+
+    # Agregar céntimos si existen
+    if decimals > 0:
+        return f"{palabras} {currency_words} CON {decimals:02d}/100"
+    return f"{palabras} {currency_words}"
+
+
 class CashReceipt(models.Model):
     _name = 'cash.receipt'
     _description = 'Recibo de Constancia por Entrega de Efectivo'
@@ -28,6 +117,7 @@ class CashReceipt(models.Model):
     date = fields.Date(
         string='Fecha',
         required=True,
+        index=True,
         default=fields.Date.context_today,
         tracking=True
     )
@@ -36,7 +126,7 @@ class CashReceipt(models.Model):
     area = fields.Selection([
         ('logistica', 'Logística'),
         ('admin_gerencia', 'Administración Gerencia')
-    ], string='Área que Genera', required=True, tracking=True,
+    ], string='Área que Genera', required=True, tracking=True, index=True,
        help='Área de la empresa que genera el recibo')
     
     # Personas involucradas
@@ -77,7 +167,7 @@ class CashReceipt(models.Model):
         ('draft', 'Borrador'),
         ('confirmed', 'Confirmado'),
         ('cancelled', 'Cancelado')
-    ], string='Estado', default='draft', tracking=True)
+    ], string='Estado', default='draft', tracking=True, index=True)
     
     # Campo calculado para mostrar nombre
     display_name = fields.Char(
@@ -100,6 +190,20 @@ class CashReceipt(models.Model):
         readonly=True
     )
 
+    # Monto en letras precalculado para los reportes
+    amount_in_words = fields.Char(
+        string='Monto en Letras',
+        compute='_compute_amount_in_words',
+        store=True
+    )
+
+    def init(self):
+        # Regla de registro de usuarios: creador + estado
+        tools.create_index(
+            self.env.cr, 'cash_receipt_created_by_id_state_index',
+            self._table, ['created_by_id', 'state'],
+        )
+
     @api.model
     def create(self, vals):
         """Crear registro en borrador sin secuencia"""
@@ -108,9 +212,27 @@ class CashReceipt(models.Model):
             vals['name'] = 'Borrador'
         return super(CashReceipt, self).create(vals)
 
+    def _get_report_cache_name(self):
+        """Nombre del PDF guardado del recibo: un recibo confirmado ya no cambia"""
+        self.ensure_one()
+        return report_cache_name(self, self.state == 'confirmed')
+
     def _get_next_sequence(self):
         """Obtener la siguiente secuencia para el recibo"""
-        return self.env['ir.sequence'].with_company(self.company_id).next_by_code('cash.receipt') or 'REC/001'
+        return self._get_next_sequences()[0]
+
+    def _get_next_sequences(self):
+        """Reservar en lote la siguiente secuencia de cada recibo, una llamada por compañía"""
+        names = {}
+        for company, records in self.grouped('company_id').items():
+            numbers = self.env['ir.sequence'].with_company(company).next_batch_by_code('cash.receipt', len(records))
+            names.update(zip(records, numbers))
+        return [names[record] or 'REC/001' for record in self]
+
+    @api.depends('amount', 'currency_id')
+    def _compute_amount_in_words(self):
+        for record in self:
+            record.amount_in_words = record.amount_to_words()
 
     @api.depends('name', 'date', 'partner_id', 'state')
     def _compute_display_name(self):
@@ -178,10 +300,15 @@ class CashReceipt(models.Model):
                         "Para confirmar un recibo de Administración Gerencia, "
                         "debe especificar el 'Concepto'."
                     )
-            
+
+        # Reservar de una vez los números de todos los recibos a confirmar
+        to_number = self.filtered(lambda r: r.name == 'Borrador')
+        names = dict(zip(to_number, to_number._get_next_sequences()))
+
+        for record in self:
             # Asignar secuencia al confirmar el recibo
-            if record.name == 'Borrador':
-                record.name = record._get_next_sequence()
+            if record in names:
+                record.name = names[record]
             
             record.write({'state': 'confirmed'})
             record.message_post(
@@ -191,6 +318,7 @@ class CashReceipt(models.Model):
 
     def action_cancel(self):
         """Cancelar el recibo"""
+        self.env['ir.actions.report']._unlink_report_cache(self)
         for record in self:
             if record.state == 'cancelled':
                 raise UserError("El recibo ya está cancelado.")
@@ -203,6 +331,7 @@ class CashReceipt(models.Model):
 
     def action_reset_to_draft(self):
         """Restablecer a borrador"""
+        self.env['ir.actions.report']._unlink_report_cache(self)
         for record in self:
             if record.state == 'draft':
                 raise UserError("El recibo ya está en estado borrador.")
@@ -283,95 +412,13 @@ class CashReceipt(models.Model):
 
     def amount_to_words(self):
         """Convertir el monto a palabras en español"""
-        try:
-            amount = int(self.amount)
-            decimals = int((self.amount - amount) * 100)
-            
-            # Números básicos
-            unidades = ["", "UNO", "DOS", "TRES", "CUATRO", "CINCO", "SEIS", "SIETE", "OCHO", "NUEVE"]
-            decenas = ["", "", "VEINTE", "TREINTA", "CUARENTA", "CINCUENTA", "SESENTA", "SETENTA", "OCHENTA", "NOVENTA"]
-            especiales = ["DIEZ", "ONCE", "DOCE", "TRECE", "CATORCE", "QUINCE", "DIECISÉIS", "DIECISIETE", "DIECIOCHO", "DIECINUEVE"]
-            centenas = ["", "CIENTO", "DOSCIENTOS", "TRESCIENTOS", "CUATROCIENTOS", "QUINIENTOS", "SEISCIENTOS", "SETECIENTOS", "OCHOCIENTOS", "NOVECIENTOS"]
-            
-            def convertir_hasta_999(num):
-                if num == 0:
-                    return ""
-                elif num == 100:
-                    return "CIEN"
-                elif num < 10:
-                    return unidades[num]
-                elif num < 20:
-                    return especiales[num - 10]
-                elif num < 100:
-                    d = num // 10
-                    u = num % 10
-                    if u == 0:
-                        return decenas[d]
-                    else:
-                        return decenas[d] + " Y " + unidades[u]
-                else:
-                    c = num // 100
-                    resto = num % 100
-                    resultado = centenas[c]
-                    if resto > 0:
-                        if resto < 10:
-                            resultado += " " + unidades[resto]
-                        elif resto < 20:
-                            resultado += " " + especiales[resto - 10]
-                        else:
-                            d = resto // 10
-                            u = resto % 10
-                            if u == 0:
-                                resultado += " " + decenas[d]
-                            else:
-                                resultado += " " + decenas[d] + " Y " + unidades[u]
-                    return resultado
-            
-            if amount == 0:
-                return "CERO SOLES"
-            
-            # Convertir miles
-            if amount < 1000:
-                palabras = convertir_hasta_999(amount)
-            elif amount < 1000000:
-                miles = amount // 1000
-                resto = amount % 1000
-                if miles == 1:
-                    palabras = "MIL"
-                else:
-                    palabras = convertir_hasta_999(miles) + " MIL"
-                
-                if resto > 0:
-                    palabras += " " + convertir_hasta_999(resto)
-            else:
-                millones = amount // 1000000
-                resto = amount % 1000000
-                if millones == 1:
-                    palabras = "UN MILLÓN"
-                else:
-                    palabras = convertir_hasta_999(millones) + " MILLONES"
-                
-                if resto >= 1000:
-                    miles = resto // 1000
-                    resto_final = resto % 1000
-                    if miles > 0:
-                        if miles == 1:
-                            palabras += " MIL"
-                        else:
-                            palabras += " " + convertir_hasta_999(miles) + " MIL"
-                    if resto_final > 0:
-                        palabras += " " + convertir_hasta_999(resto_final)
-                elif resto > 0:
-                    palabras += " " + convertir_hasta_999(resto)
-            
-            # Agregar centavos si existen
-            if decimals > 0:
-                return palabras + " SOLES CON " + str(decimals).zfill(2) + "/100"
-            else:
-                return palabras + " SOLES"
-                
-        except:
-            return f"MONTO: {self.amount:.2f} SOLES"
+        self.ensure_one()
+        return amount_to_words(self.amount, self._get_currency_words())
+
+    def _get_currency_words(self):
+        """Nombre en letras (plural) de la moneda del recibo"""
+        currency = self.currency_id or self.company_id.currency_id
+        return CURRENCY_WORDS.get(currency.name) or (currency.currency_unit_label or currency.name or 'SOLES').upper()
 
     @api.model
     def get_receipts_by_period(self, date_from, date_to):
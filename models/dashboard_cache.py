@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict
+
+# Versiones de la caché por usuario, compartidas por todos los workers: cada cambio
+# inserta una fila con un número de la secuencia; la versión de un usuario es la mayor
+DASHBOARD_CACHE_VERSION_TABLE = 'petty_cash_dashboard_cache_version'
+DASHBOARD_CACHE_SEQUENCE = 'petty_cash_dashboard_cache_version_seq'
+
+
+def create_cache_version_table(cr):
+    """Crear la tabla y la secuencia de versiones de la caché si no existen"""
+    cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {DASHBOARD_CACHE_SEQUENCE}")
+    cr.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DASHBOARD_CACHE_VERSION_TABLE} (
+            user_id integer NOT NULL,
+            version bigint NOT NULL DEFAULT nextval('{DASHBOARD_CACHE_SEQUENCE}')
+        )
+    """)
+    cr.execute(f"""
+        CREATE INDEX IF NOT EXISTS {DASHBOARD_CACHE_VERSION_TABLE}_user_id_version_index
+            ON {DASHBOARD_CACHE_VERSION_TABLE} (user_id, version)
+    """)
+
+
+def get_cache_version(cr, user_id):
+    """Versión vigente de la caché del dashboard del usuario"""
+    cr.execute(f"SELECT max(version) FROM {DASHBOARD_CACHE_VERSION_TABLE} WHERE user_id = %s", [user_id])
+    return cr.fetchone()[0] or 0
+
+
+def bump_cache_versions(cr, user_ids):
+    """Dar una nueva versión a la caché de los usuarios
+
+    Solo se insertan filas, así las transacciones concurrentes no compiten por
+    actualizar la misma; la nueva versión es visible para los demás workers al
+    confirmarse la transacción, cuando sus datos ya son los nuevos.
+    """
+    cr.execute(
+        f"INSERT INTO {DASHBOARD_CACHE_VERSION_TABLE} (user_id) SELECT unnest(%s::int[])",
+        [sorted(user_ids)],
+    )
+
+
+def gc_cache_versions(cr):
+    """Eliminar las versiones superadas, conservando la última de cada usuario"""
+    cr.execute(f"""
+        DELETE FROM {DASHBOARD_CACHE_VERSION_TABLE} AS old
+         WHERE old.version < (
+                SELECT max(version) FROM {DASHBOARD_CACHE_VERSION_TABLE}
+                 WHERE user_id = old.user_id
+         )
+    """)
+
+
+class DashboardStatsCache:
+    """Caché LRU con expiración para las estadísticas del dashboard de cajas
+
+    Las claves empiezan por (base de datos, usuario, compañías, versión). La caché
+    es local a cada proceso; la versión del usuario, que cambia al modificar una de
+    sus cajas, descarta en todos los workers solo sus entradas calculadas antes del
+    cambio.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Obtener un valor vigente o None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Guardar un valor descartando los menos usados si se supera el tamaño"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, dbname, user_ids=None):
+        """Eliminar las entradas de la base de datos, opcionalmente solo de ciertos usuarios"""
+        with self._lock:
+            keys = [
+                key for key in self._data
+                if key[0] == dbname and (user_ids is None or key[1] in user_ids)
+            ]
+            for key in keys:
+                del self._data[key]
+
+
+dashboard_stats_cache = DashboardStatsCache()
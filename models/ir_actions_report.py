@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import api, models
+from odoo.tools.pdf import merge_pdf
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+# Reportes de caja que se pueden generar por segmentos de líneas
+CHUNKED_CASH_REPORTS = {
+    'petty_cash.report_petty_cash',
+    'petty_cash.report_distribution_cash',
+    'petty_cash.report_logistics_cash',
+    'petty_cash.report_cash_box',
+}
+
+# Campos de las líneas leídos por los reportes de caja
+REPORT_LINE_FIELDS = [
+    'date', 'document_type', 'document_number', 'partner_name',
+    'description', 'line_type', 'amount', 'balance',
+]
+
+DEFAULT_REPORT_CHUNK_SIZE = 500
+
+# Prefijo de los PDF guardados de registros que ya no cambian
+REPORT_CACHE_PREFIX = 'report_cache_'
+
+
+def report_cache_name(record, immutable):
+    """Nombre del adjunto con el PDF guardado del registro, o False si aún puede cambiar
+
+    El nombre incluye la versión instalada del módulo y el parámetro
+    ``petty_cash.report_cache_version``: al actualizar las plantillas (o al
+    cambiar el parámetro) los PDF guardados dejan de coincidir y se regeneran.
+
+    Una caja cerrada no puede cancelarse ni volver a borrador, por lo que su PDF
+    nunca se elimina: cambiar ``petty_cash.report_cache_version`` es la única forma
+    de invalidarlo. Los recibos confirmados sí pueden cancelarse o restablecerse y
+    sus PDF se eliminan en ese momento.
+    """
+    if not immutable:
+        return False
+    module_version = record.env.ref('base.module_petty_cash').sudo().latest_version
+    cache_version = record.env['ir.config_parameter'].sudo().get_param('petty_cash.report_cache_version', '1')
+    return f'{REPORT_CACHE_PREFIX}{record._table}_{record.id}_v{module_version}-{cache_version}.pdf'
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Generar por segmentos los reportes de caja con muchas líneas
+
+        Cada caja se renderiza en segmentos de ``petty_cash.report_chunk_size`` líneas
+        (encabezado en el primero, totales y firmas en el último) y los PDF se unen al
+        final, así la memoria de QWeb y wkhtmltopdf no crece con el número de líneas.
+        """
+        report = self._get_report(report_ref)
+        if report.report_name not in CHUNKED_CASH_REPORTS or not res_ids:
+            return super(IrActionsReport, self)._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'petty_cash.report_chunk_size', DEFAULT_REPORT_CHUNK_SIZE))
+        boxes = self.env[report.model].browse(res_ids)
+        line_field = boxes._fields['line_ids']
+        line_counts = dict(self.env[line_field.comodel_name]._read_group(
+            [(line_field.inverse_name, 'in', boxes.ids)], [line_field.inverse_name], ['__count']))
+        if chunk_size <= 0 or max(line_counts.values(), default=0) <= chunk_size:
+            return super(IrActionsReport, self)._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        return self._render_qweb_pdf_chunked(report, report_ref, boxes, chunk_size, data=data), 'pdf'
+
+    def _render_qweb_pdf_chunked(self, report, report_ref, boxes, chunk_size, data=None):
+        """Renderizar cada caja en segmentos de líneas y unir los PDF resultantes
+
+        Respeta el PDF guardado de la caja (``attachment_use``) y guarda el PDF unido
+        si el reporte define ``attachment``, igual que el renderizado estándar.
+        """
+        Line = self.env[boxes._fields['line_ids'].comodel_name]
+        streams = []
+        render = super(IrActionsReport, self.with_context(report_pdf_no_attachment=True))._render_qweb_pdf
+        for box in boxes:
+            attachment = report.attachment_use and report._retrieve_attachment(box)
+            if attachment:
+                streams.append(attachment.raw)
+                continue
+            box_streams = []
+            line_ids = box.line_ids.ids
+            chunks = [line_ids[start:start + chunk_size] for start in range(0, len(line_ids), chunk_size)] or [[]]
+            for index, chunk in enumerate(chunks):
+                # Un solo SELECT por segmento para las columnas del reporte
+                Line.browse(chunk).fetch(REPORT_LINE_FIELDS)
+                pdf_content, _report_type = render(report_ref, res_ids=[box.id], data=dict(
+                    data or {},
+                    chunk_line_ids=chunk,
+                    chunk_first=index == 0,
+                    chunk_last=index == len(chunks) - 1,
+                ))
+                box_streams.append(pdf_content)
+                # Liberar la caché de las líneas ya impresas
+                self.env.invalidate_all()
+            _logger.info("Reporte de %s generado en %s segmentos", box.display_name, len(chunks))
+            box_pdf = merge_pdf(box_streams)
+            streams.append(box_pdf)
+            self._save_report_cache(report, box, box_pdf)
+        return merge_pdf(streams)
+
+    def _save_report_cache(self, report, record, pdf_content):
+        """Guardar el PDF del registro como adjunto si el reporte lo indica"""
+        if not report.attachment or self.env.context.get('report_pdf_no_attachment'):
+            return
+        attachment_name = safe_eval(report.attachment, {'object': record, 'time': time})
+        if attachment_name:
+            self.env['ir.attachment'].sudo().create({
+                'name': attachment_name,
+                'raw': pdf_content,
+                'res_model': record._name,
+                'res_id': record.id,
+                'type': 'binary',
+            })
+
+    @api.model
+    def _unlink_report_cache(self, records):
+        """Eliminar los PDF guardados de los registros, que vuelven a poder cambiar"""
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', records._name),
+            ('res_id', 'in', records.ids),
+            ('name', '=like', f'{REPORT_CACHE_PREFIX}%'),
+        ]).unlink()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+def _select_nextval_batch(cr, seq_name, count):
+    """Reservar ``count`` valores de una secuencia de PostgreSQL en una sola consulta"""
+    cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [seq_name, count])
+    return sorted(row[0] for row in cr.fetchall())
+
+
+def _update_nogap_batch(record, number_increment, count):
+    """Reservar ``count`` números sin huecos con una sola actualización de la fila"""
+    record.flush_recordset(['number_next'])
+    record.env.cr.execute(
+        f"UPDATE {record._table} SET number_next = number_next + %s WHERE id = %s RETURNING number_next",
+        [number_increment * count, record.id],
+    )
+    last = record.env.cr.fetchone()[0]
+    record.invalidate_recordset(['number_next'])
+    first = last - number_increment * count
+    return [first + number_increment * i for i in range(count)]
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def next_batch_by_code(self, sequence_code, count, sequence_date=None):
+        """Reservar ``count`` números de la secuencia con el código indicado
+
+        Equivale a ``count`` llamadas a ``next_by_code`` pero con una sola consulta:
+        ``nextval`` sobre ``generate_series`` para la implementación estándar y un
+        único ``UPDATE ... RETURNING`` para la implementación sin huecos.
+        Devuelve una lista de ``count`` elementos, ``False`` si no existe la secuencia.
+        """
+        if count <= 0:
+            return []
+        self.browse().check_access('read')
+        company_id = self.env.company.id
+        seq_ids = self.search(
+            [('code', '=', sequence_code), ('company_id', 'in', [company_id, False])],
+            order='company_id',
+        )
+        if not seq_ids:
+            _logger.debug(
+                "No ir.sequence has been found for code '%s'. Please make sure a sequence "
+                "is set for current company.", sequence_code)
+            return [False] * count
+        return seq_ids[0]._next_batch(count, sequence_date=sequence_date)
+
+    def _next_batch(self, count, sequence_date=None):
+        """Reservar ``count`` números, en el rango de fechas correspondiente si aplica"""
+        self.ensure_one()
+        if not self.use_date_range:
+            return self._next_batch_do(count)
+        dt = sequence_date or self._context.get('ir_sequence_date', fields.Date.today())
+        seq_date = self.env['ir.sequence.date_range'].search([
+            ('sequence_id', '=', self.id),
+            ('date_from', '<=', dt),
+            ('date_to', '>=', dt),
+        ], limit=1)
+        if not seq_date:
+            seq_date = self._create_date_range_seq(dt)
+        return seq_date.with_context(ir_sequence_date_range=seq_date.date_from)._next_batch(count)
+
+    def _next_batch_do(self, count):
+        if self.implementation == 'standard':
+            numbers = _select_nextval_batch(self.env.cr, 'ir_sequence_%03d' % self.id, count)
+        else:
+            numbers = _update_nogap_batch(self, self.number_increment, count)
+        return self._get_next_chars(numbers)
+
+    def _get_next_chars(self, numbers):
+        """Formatear los números reservados con el prefijo y sufijo, interpolados una vez"""
+        prefix, suffix = self._get_prefix_suffix()
+        return [prefix + '%%0%sd' % self.padding % number + suffix for number in numbers]
+
+
+class IrSequenceDateRange(models.Model):
+    _inherit = 'ir.sequence.date_range'
+
+    def _next_batch(self, count):
+        sequence = self.sequence_id
+        if sequence.implementation == 'standard':
+            numbers = _select_nextval_batch(
+                self.env.cr, 'ir_sequence_%03d_%03d' % (sequence.id, self.id), count)
+        else:
+            numbers = _update_nogap_batch(self, sequence.number_increment, count)
+        return sequence._get_next_chars(numbers)
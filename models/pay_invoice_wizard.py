@@ -3,6 +3,16 @@
 from odoo import models, fields, api
 from odoo.exceptions import UserError
 
+from .cash_line_import_wizard import CASH_LINE_MODELS
+
+# Dominio de las facturas que se pueden pagar desde caja
+PAYABLE_INVOICE_DOMAIN = [
+    ('move_type', 'in', ['out_invoice', 'in_invoice', 'out_refund', 'in_refund']),
+    ('state', '=', 'posted'),
+    ('payment_state', 'in', ['not_paid', 'partial']),
+]
+
+
 class PayInvoiceWizard(models.TransientModel):
     _name = 'pay.invoice.wizard'
     _description = 'Asistente para Pagar Facturas desde Caja'
@@ -11,7 +21,8 @@ class PayInvoiceWizard(models.TransientModel):
     cash_type = fields.Selection([
         ('petty', 'Caja Chica'),
         ('distribution', 'Caja de Distribución'),
-        ('logistics', 'Caja de Logística')
+        ('logistics', 'Caja de Logística'),
+        ('box', 'Caja Configurable')
     ], string='Tipo de Caja', required=True)
     
     # Campos para cada tipo de caja
@@ -32,39 +43,59 @@ class PayInvoiceWizard(models.TransientModel):
         string='Caja de Logística',
         domain="[('state', '=', 'open')]"
     )
+
+    cash_box_id = fields.Many2one(
+        'cash.box',
+        string='Caja Configurable',
+        domain="[('state', '=', 'open')]"
+    )
     
-    # Información de la factura
-    invoice_id = fields.Many2one(
+    # Información de las facturas
+    invoice_ids = fields.Many2many(
         'account.move',
-        string='Factura a Pagar',
+        string='Facturas a Pagar',
         required=True,
         domain="[('move_type', 'in', ['out_invoice', 'in_invoice', 'out_refund', 'in_refund']), ('state', '=', 'posted'), ('payment_state', 'in', ['not_paid', 'partial'])]"
     )
     
+    invoice_count = fields.Integer(
+        string='Cantidad de Facturas',
+        compute='_compute_invoice_totals'
+    )
+    
     partner_id = fields.Many2one(
         'res.partner',
         string='Proveedor/Cliente',
-        related='invoice_id.partner_id',
-        readonly=True
+        compute='_compute_invoice_totals',
+        help='Empresa de las facturas, si todas son de la misma'
     )
     
     amount_residual = fields.Monetary(
         string='Saldo Pendiente',
-        related='invoice_id.amount_residual',
-        readonly=True
+        compute='_compute_invoice_totals',
+        help='Saldo pendiente de las facturas en la moneda de la compañía, la misma de la caja'
     )
     
     amount = fields.Monetary(
         string='Monto a Pagar',
         required=True,
-        currency_field='currency_id'
+        compute='_compute_amount',
+        store=True,
+        readonly=False,
+        currency_field='currency_id',
+        help='Con varias facturas se paga el saldo pendiente completo de cada una'
     )
     
     currency_id = fields.Many2one(
         'res.currency',
         string='Moneda',
-        related='invoice_id.currency_id',
-        readonly=True
+        compute='_compute_invoice_totals'
+    )
+    
+    group_payments = fields.Boolean(
+        string='Agrupar Pagos por Empresa',
+        default=True,
+        help='Genera un solo pago por proveedor/cliente para todas sus facturas'
     )
     
     date = fields.Date(
@@ -86,22 +117,55 @@ class PayInvoiceWizard(models.TransientModel):
         compute='_compute_cash_balance'
     )
     
-    @api.onchange('invoice_id')
-    def _onchange_invoice_id(self):
-        """Autocompletar monto con el saldo de la factura"""
-        if self.invoice_id:
-            self.amount = self.invoice_id.amount_residual
+    @api.model
+    def default_get(self, fields_list):
+        """Tomar las facturas seleccionadas en la lista o el formulario de facturas"""
+        res = super(PayInvoiceWizard, self).default_get(fields_list)
+        context = self.env.context
+        if 'invoice_ids' in fields_list and context.get('active_model') == 'account.move' and context.get('active_ids'):
+            invoices = self.env['account.move'].search(
+                PAYABLE_INVOICE_DOMAIN + [('id', 'in', context['active_ids'])])
+            res['invoice_ids'] = [(6, 0, invoices.ids)]
+        return res
     
-    @api.depends('invoice_id', 'partner_id')
+    def _get_invoice_residual(self, invoice):
+        """Saldo pendiente de la factura en la moneda de la compañía, la misma de la caja
+
+        Las facturas en otra moneda no se suman por su monto en esa moneda: el total se
+        compara con el saldo de la caja y se descuenta de ella.
+        """
+        return abs(invoice.amount_residual_signed)
+
+    @api.depends('invoice_ids')
+    def _compute_invoice_totals(self):
+        """Totales de las facturas seleccionadas, en la moneda de la compañía"""
+        for wizard in self:
+            invoices = wizard.invoice_ids
+            partners = invoices.partner_id
+            wizard.invoice_count = len(invoices)
+            wizard.partner_id = partners if len(partners) == 1 else False
+            wizard.amount_residual = sum(wizard._get_invoice_residual(invoice) for invoice in invoices)
+            wizard.currency_id = invoices.company_id.currency_id[:1] or self.env.company.currency_id
+    
+    @api.depends('invoice_ids')
+    def _compute_amount(self):
+        """Autocompletar monto con el saldo de las facturas"""
+        for wizard in self:
+            wizard.amount = sum(wizard._get_invoice_residual(invoice) for invoice in wizard.invoice_ids)
+    
+    @api.depends('invoice_ids')
     def _compute_description(self):
         """Generar descripción automática"""
         for wizard in self:
-            if wizard.invoice_id and wizard.partner_id:
-                wizard.description = f"Pago de {wizard.invoice_id.name} - {wizard.partner_id.name}"
+            if len(wizard.invoice_ids) == 1:
+                invoice = wizard.invoice_ids
+                wizard.description = f"Pago de {invoice.name} - {invoice.partner_id.name}"
+            elif wizard.invoice_ids:
+                wizard.description = f"Pago de {len(wizard.invoice_ids)} facturas"
             else:
                 wizard.description = ''
     
-    @api.depends('cash_type', 'petty_cash_id', 'distribution_cash_id', 'logistics_cash_id')
+    @api.depends('cash_type', 'petty_cash_id', 'distribution_cash_id', 'logistics_cash_id', 'cash_box_id')
     def _compute_cash_balance(self):
         """Obtener saldo de la caja seleccionada"""
         for wizard in self:
@@ -111,23 +175,43 @@ class PayInvoiceWizard(models.TransientModel):
                 wizard.cash_balance = wizard.distribution_cash_id.current_balance
             elif wizard.cash_type == 'logistics' and wizard.logistics_cash_id:
                 wizard.cash_balance = wizard.logistics_cash_id.current_balance
+            elif wizard.cash_type == 'box' and wizard.cash_box_id:
+                wizard.cash_balance = wizard.cash_box_id.current_balance
             else:
                 wizard.cash_balance = 0.0
     
-    @api.constrains('amount', 'amount_residual')
+    @api.constrains('amount', 'invoice_ids')
     def _check_amount(self):
-        """Validar que el monto no exceda el saldo de la factura"""
+        """Validar que el monto no exceda el saldo de las facturas"""
         for wizard in self:
             if wizard.amount <= 0:
                 raise UserError("El monto a pagar debe ser mayor a cero.")
-            if wizard.amount > wizard.amount_residual:
+            if wizard.currency_id.compare_amounts(wizard.amount, wizard.amount_residual) > 0:
                 raise UserError(
                     f"El monto a pagar ({wizard.amount}) no puede ser mayor "
-                    f"al saldo pendiente de la factura ({wizard.amount_residual})."
+                    f"al saldo pendiente de las facturas ({wizard.amount_residual})."
                 )
     
+    def _prepare_cash_line_vals(self, invoice, amount):
+        """Preparar los valores de la línea de caja que paga una factura"""
+        if len(self.invoice_ids) == 1:
+            description = self.description
+        else:
+            description = f"Pago de {invoice.name} - {invoice.partner_id.name}"
+        return {
+            'date': self.date,
+            'line_type': 'expense',
+            'invoice_id': invoice.id,
+            'partner_id': invoice.partner_id.id,
+            'partner_name': invoice.partner_id.name,
+            'document_type': 'factura' if invoice.move_type in ['out_invoice', 'in_invoice'] else 'boleta',
+            'document_number': invoice.name,
+            'description': description,
+            'amount': amount,
+        }
+    
     def action_pay_invoice(self):
-        """Crear línea de pago en la caja correspondiente"""
+        """Crear en un solo lote las líneas de pago en la caja correspondiente"""
         self.ensure_one()
         
         # Validar que se haya seleccionado una caja
@@ -137,45 +221,51 @@ class PayInvoiceWizard(models.TransientModel):
             raise UserError("Debe seleccionar una Caja de Distribución.")
         elif self.cash_type == 'logistics' and not self.logistics_cash_id:
             raise UserError("Debe seleccionar una Caja de Logística.")
+        elif self.cash_type == 'box' and not self.cash_box_id:
+            raise UserError("Debe seleccionar una Caja Configurable.")
         
-        # Validar saldo de caja
-        if self.amount > self.cash_balance:
+        # Validar que todas las facturas sigan pendientes de pago
+        invoices = self.invoice_ids
+        paid = invoices - invoices.filtered_domain(PAYABLE_INVOICE_DOMAIN)
+        if paid:
             raise UserError(
-                f"Saldo insuficiente en la caja. "
-                f"Saldo disponible: {self.cash_balance}, Monto a pagar: {self.amount}"
+                "Las siguientes facturas ya no están pendientes de pago: "
+                + ", ".join(paid.mapped('name'))
             )
         
-        # Preparar valores de la línea
-        line_vals = {
-            'date': self.date,
-            'line_type': 'expense',
-            'invoice_id': self.invoice_id.id,
-            'partner_id': self.partner_id.id,
-            'partner_name': self.partner_id.name,
-            'document_type': 'factura' if self.invoice_id.move_type in ['out_invoice', 'in_invoice'] else 'boleta',
-            'document_number': self.invoice_id.name,
-            'description': self.description,
-            'amount': self.amount,
-        }
+        # Validar el total contra el saldo sin bloquear, para no contabilizar pagos en vano
+        field_name, line_model = CASH_LINE_MODELS[self.cash_type]
+        cash = self[field_name]
+        cash._lock_and_check_withdrawal(self.amount, lock=False)
+        
+        # Una factura admite pago parcial; varias se pagan por su saldo completo
+        vals_list = []
+        for invoice in invoices:
+            amount = self.amount if len(invoices) == 1 else self._get_invoice_residual(invoice)
+            vals_list.append(dict(self._prepare_cash_line_vals(invoice, amount), **{field_name: cash.id}))
+        Line = self.env[line_model].with_context(group_invoice_payments=self.group_payments)
+        
+        # Publicar y conciliar los pagos (agrupados por empresa) antes de bloquear la caja:
+        # el bloqueo dura hasta el commit y no debe cubrir la contabilización
+        if not cash.deferred_posting:
+            new_lines = Line.browse()
+            for vals in vals_list:
+                new_lines |= Line.new(vals)
+            new_lines._create_payments_for_invoices()
+            for vals, new_line in zip(vals_list, new_lines):
+                vals['payment_id'] = new_line.payment_id.id
         
-        # Crear línea en la caja correspondiente
-        if self.cash_type == 'petty':
-            line_vals['petty_cash_id'] = self.petty_cash_id.id
-            line = self.env['petty.cash.line'].create(line_vals)
-            cash = self.petty_cash_id
-        elif self.cash_type == 'distribution':
-            line_vals['distribution_cash_id'] = self.distribution_cash_id.id
-            line = self.env['distribution.cash.line'].create(line_vals)
-            cash = self.distribution_cash_id
-        else:  # logistics
-            line_vals['logistics_cash_id'] = self.logistics_cash_id.id
-            line = self.env['logistics.cash.line'].create(line_vals)
-            cash = self.logistics_cash_id
+        # Bloquear la caja y validar el total contra su saldo vigente justo antes de insertar
+        cash._lock_and_check_withdrawal(self.amount)
+        lines = Line.create(vals_list)
         
         # Mensaje de éxito
-        message = f"Pago registrado exitosamente. Factura: {self.invoice_id.name}, Monto: {self.amount}"
-        if line.payment_id:
-            message += f". Pago generado: {line.payment_id.name}"
+        if len(invoices) == 1:
+            message = f"Pago registrado exitosamente. Factura: {invoices.name}, Monto: {self.amount}"
+        else:
+            message = f"Pago registrado exitosamente. Facturas: {len(invoices)}, Monto total: {self.amount}"
+        if lines.payment_id:
+            message += f". Pagos generados: {', '.join(lines.payment_id.mapped('name'))}"
         
         return {
             'type': 'ir.actions.client',
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+# Campos de los recibos leídos por el reporte
+RECEIPT_REPORT_FIELDS = [
+    'name', 'date', 'amount', 'amount_in_words', 'area', 'concept', 'notes', 'partner_id', 'company_id',
+]
+
+
+class ReportCashReceipt(models.AbstractModel):
+    _name = 'report.petty_cash.report_cash_receipt'
+    _description = 'Reporte de Recibos de Constancia'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Preparar en lote los datos de todos los recibos a imprimir
+
+        Los recibos, personas y empresas se leen con una consulta por modelo (el monto
+        en letras es una columna almacenada), de modo que el documento completo se
+        renderiza sin accesos perezosos por recibo.
+        """
+        docs = self.env['cash.receipt'].browse(docids)
+        docs.fetch(RECEIPT_REPORT_FIELDS)
+        docs.partner_id.fetch(['name', 'vat'])
+        docs.company_id.fetch(['name', 'vat'])
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'cash.receipt',
+            'docs': docs,
+            'data': data,
+        }
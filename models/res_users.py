@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+from .dashboard_cache import gc_cache_versions
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    @api.autovacuum
+    def _gc_dashboard_cache_versions(self):
+        """Purgar las versiones superadas de la caché del dashboard de cajas"""
+        gc_cache_versions(self.env.cr)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_amount_to_words
+from . import test_concurrent_withdrawal
+from . import test_indexes
+from . import test_invoice_payments
+from . import test_line_balance_volume
+from . import test_line_balances
+from . import test_receipt_report
+from . import test_sequence_batch
+from . import test_xlsx_export
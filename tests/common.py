@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class CashBoxTestCommon(AccountTestInvoicingCommon):
+    """Datos comunes de las pruebas de cajas: diario de efectivo y ayudas de creación"""
+
+    @classmethod
+    def setUpClass(cls):
+        super(CashBoxTestCommon, cls).setUpClass()
+        cls.cash_journal = cls.company_data['default_journal_cash']
+
+    @classmethod
+    def _create_box(cls, initial_amount=100.0, **vals):
+        """Crear una caja chica en borrador: sus movimientos no generan asientos"""
+        return cls.env['petty.cash'].create(dict({
+            'journal_id': cls.cash_journal.id,
+            'initial_amount': initial_amount,
+        }, **vals))
+
+    @classmethod
+    def _create_lines(cls, box, specs):
+        """Crear en un lote movimientos ``(secuencia, tipo, monto)`` en la caja"""
+        return cls.env['petty.cash.line'].create([{
+            'petty_cash_id': box.id,
+            'sequence': sequence,
+            'line_type': line_type,
+            'amount': amount,
+            'description': f'Movimiento {index}',
+        } for index, (sequence, line_type, amount) in enumerate(specs)])
+
+    def _read_balances(self, box):
+        """Saldos guardados en base de datos de las líneas de la caja"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        return {line.id: line.balance for line in box.line_ids}
+
+    def assertBalancesMatchRecompute(self, box):
+        """Los saldos desplazados coinciden con un recálculo completo de la caja"""
+        shifted = self._read_balances(box)
+
+        expected = {}
+        balance = box.initial_amount
+        for line in box.line_ids.sorted(lambda l: (l.sequence, l.id)):
+            balance += line.amount if line.line_type == 'income' else -line.amount
+            expected[line.id] = balance
+
+        box._recompute_line_balances()
+        recomputed = self._read_balances(box)
+
+        self.assertEqual(shifted.keys(), recomputed.keys())
+        for line_id, value in recomputed.items():
+            self.assertAlmostEqual(value, expected[line_id], places=2)
+            self.assertAlmostEqual(shifted[line_id], value, places=2, msg=f"Saldo desplazado de la línea {line_id}")
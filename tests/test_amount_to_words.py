@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import BaseCase
+
+from ..models.cash_receipt import MAX_AMOUNT_IN_WORDS, amount_to_words
+
+
+class TestAmountToWords(BaseCase):
+    """Conversión a letras del monto de los recibos"""
+
+    def test_amounts(self):
+        cases = [
+            (0.29, "CERO SOLES CON 29/100"),
+            (1000, "MIL SOLES"),
+            (1e6, "UN MILLÓN SOLES"),
+            (1e9, "MIL MILLONES SOLES"),
+            (2500000000, "DOS MIL QUINIENTOS MILLONES SOLES"),
+            (1e12, "UN BILLÓN SOLES"),
+            (1000001.5, "UN MILLÓN UNO SOLES CON 50/100"),
+        ]
+        for amount, words in cases:
+            with self.subTest(amount=amount):
+                self.assertEqual(amount_to_words(amount), words)
+
+    def test_cents_are_rounded_half_up(self):
+        self.assertEqual(amount_to_words(10.005, 'DÓLARES'), "DIEZ DÓLARES CON 01/100")
+
+    def test_amount_out_of_range(self):
+        with self.assertRaises(ValidationError):
+            amount_to_words(MAX_AMOUNT_IN_WORDS)
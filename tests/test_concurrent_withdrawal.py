@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import psycopg2
+
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import UserError
+from odoo.modules.registry import Registry
+from odoo.tests.common import BaseCase, get_db_name, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestConcurrentWithdrawal(BaseCase):
+    """Dos pagos simultáneos desde una misma caja no pueden dejarla en negativo
+
+    Cada pago corre en su propio hilo con un cursor real, por lo que los datos
+    de prueba se confirman en la base de datos y se eliminan al terminar.
+    """
+
+    def setUp(self):
+        super(TestConcurrentWithdrawal, self).setUp()
+        self.registry = Registry(get_db_name())
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            journal = env['account.journal'].search([
+                ('type', '=', 'cash'),
+                ('company_id', '=', env.company.id),
+                ('default_account_id', '!=', False),
+            ], limit=1)
+            if not journal:
+                self.skipTest("No hay un diario de efectivo configurado")
+
+            partner = env['res.partner'].create({'name': 'Proveedor Retiro Concurrente'})
+            bills = env['account.move'].create([{
+                'move_type': 'in_invoice',
+                'partner_id': partner.id,
+                'invoice_date': '2024-01-01',
+                'invoice_line_ids': [(0, 0, {
+                    'name': f'Servicio {index}',
+                    'quantity': 1,
+                    'price_unit': 60.0,
+                    'tax_ids': [(6, 0, [])],
+                })],
+            } for index in range(2)])
+            bills.action_post()
+
+            box = env['petty.cash'].create({
+                'responsible_id': SUPERUSER_ID,
+                'journal_id': journal.id,
+                'initial_amount': 100.0,
+            })
+            box.action_open()
+
+            self.partner_id = partner.id
+            self.bill_ids = bills.ids
+            self.box_id = box.id
+        self.addCleanup(self._cleanup)
+
+    def _cleanup(self):
+        """Eliminar los datos confirmados por la prueba"""
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            box = env['petty.cash'].browse(self.box_id).exists()
+            payments = box.line_ids.payment_id
+            moves = box.move_id | box.line_ids.move_id | env['account.move'].browse(self.bill_ids).exists()
+            payments.action_draft()
+            payments.unlink()
+            # Las cajas abiertas no se pueden eliminar desde el ORM
+            cr.execute("DELETE FROM petty_cash WHERE id = %s", [box.id])
+            cr.execute(
+                "DELETE FROM cash_box_summary WHERE res_model = %s AND res_id = %s",
+                [box._name, box.id],
+            )
+            env.invalidate_all()
+            moves = moves.exists()
+            moves.filtered(lambda m: m.state == 'posted').button_draft()
+            moves.with_context(force_delete=True).unlink()
+            env['res.partner'].browse(self.partner_id).unlink()
+
+    def _pay_bill(self, bill_id, barrier, results):
+        """Pagar una factura desde la caja en un cursor propio y guardar el resultado"""
+        try:
+            with self.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                wizard = env['pay.invoice.wizard'].create({
+                    'cash_type': 'petty',
+                    'petty_cash_id': self.box_id,
+                    'invoice_ids': [(6, 0, [bill_id])],
+                })
+                barrier.wait(timeout=10)
+                wizard.action_pay_invoice()
+            results[bill_id] = 'paid'
+        except (UserError, psycopg2.errors.SerializationFailure, psycopg2.errors.LockNotAvailable) as e:
+            results[bill_id] = e
+
+    def test_concurrent_payments_never_overdraw_box(self):
+        """Solo uno de dos pagos de 60 sobre una caja de 100 puede confirmarse"""
+        barrier = threading.Barrier(2)
+        results = {}
+        threads = [
+            threading.Thread(target=self._pay_bill, args=(bill_id, barrier, results))
+            for bill_id in self.bill_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+            self.assertFalse(thread.is_alive(), "Un pago quedó bloqueado indefinidamente")
+
+        outcomes = list(results.values())
+        self.assertEqual(len(outcomes), 2, "Un pago terminó con un error inesperado")
+        self.assertEqual(outcomes.count('paid'), 1, "Exactamente un pago debe confirmarse")
+        rejected = next(outcome for outcome in outcomes if outcome != 'paid')
+        self.assertIsInstance(rejected, (UserError, psycopg2.errors.SerializationFailure))
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            box = env['petty.cash'].browse(self.box_id)
+            self.assertEqual(len(box.line_ids), 1)
+            self.assertAlmostEqual(box.current_balance, 40.0)
+            self.assertTrue(all(line.balance >= 0 for line in box.line_ids))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import SQL
+
+# Modelos de caja -> campo de la caja en su modelo de líneas
+BOX_LINE_FIELDS = {
+    'petty.cash': 'petty_cash_id',
+    'distribution.cash': 'distribution_cash_id',
+    'logistics.cash': 'logistics_cash_id',
+    'cash.box': 'cash_box_id',
+}
+
+
+@tagged('post_install', '-at_install')
+class TestIndexes(TransactionCase):
+    """Las consultas más frecuentes pueden resolverse con los índices del módulo
+
+    Los planes se obtienen con ``enable_seqscan`` desactivado: en una base de pruebas
+    casi vacía el planificador preferiría leer la tabla entera, pero si la forma de
+    la consulta no coincide con el índice tampoco podría usarlo.
+    """
+
+    def _plan_indexes(self, query):
+        """Nombres de los índices que usa el plan de la consulta"""
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query))
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        names = set()
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node.get('Index Name'):
+                names.add(node['Index Name'])
+            nodes.extend(node.get('Plans', []))
+        return names
+
+    def _select(self, model_name, where, *params, order=None):
+        """Consulta de ids con la misma forma que las del ORM sobre la tabla del modelo"""
+        query = SQL("SELECT id FROM %s WHERE " + where, SQL.identifier(self.env[model_name]._table), *params)
+        return SQL("%s ORDER BY %s", query, SQL(order)) if order else query
+
+    def test_box_record_rule_and_dashboard(self):
+        for model_name in BOX_LINE_FIELDS:
+            with self.subTest(model=model_name):
+                table = self.env[model_name]._table
+                query = self._select(model_name, "responsible_id = %s AND state = %s", self.env.uid, 'open')
+                self.assertIn(f'{table}_responsible_id_state_index', self._plan_indexes(query))
+
+    def test_box_lines_in_balance_order(self):
+        for model_name, box_field in BOX_LINE_FIELDS.items():
+            with self.subTest(model=model_name):
+                Line = self.env[self.env[model_name]._fields['line_ids'].comodel_name]
+                query = self._select(Line._name, f"{box_field} = %s", 1, order='sequence, id')
+                self.assertIn(f'{Line._table}_{box_field}_sequence_index', self._plan_indexes(query))
+
+    def test_balance_predecessor_lookup(self):
+        """Consulta del saldo previo al crear una línea (``_seed_balances``)"""
+        Line = self.env['petty.cash.line']
+        query = SQL(
+            """SELECT balance FROM %s
+                WHERE petty_cash_id = %s AND (sequence, id) < (%s, %s)
+             ORDER BY sequence DESC, id DESC
+                LIMIT 1""",
+            SQL.identifier(Line._table), 1, 10, 100,
+        )
+        self.assertIn(f'{Line._table}_petty_cash_id_sequence_index', self._plan_indexes(query))
+
+    def test_receipt_record_rule(self):
+        query = self._select('cash.receipt', "created_by_id = %s AND state = %s", self.env.uid, 'confirmed')
+        self.assertIn('cash_receipt_created_by_id_state_index', self._plan_indexes(query))
+
+    def test_summary_dashboard(self):
+        query = self._select(
+            'cash.box.summary', "responsible_id = %s AND res_model = %s", self.env.uid, 'petty.cash')
+        self.assertIn(
+            'cash_box_summary_responsible_id_res_model_state_index', self._plan_indexes(query))
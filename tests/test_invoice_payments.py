@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import CashBoxTestCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestInvoicePayments(CashBoxTestCommon):
+    """Pago de muchas facturas desde una caja en una sola ejecución del asistente"""
+
+    INVOICE_COUNT = 200
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestInvoicePayments, cls).setUpClass()
+        cls.partners = cls.env['res.partner'].create([
+            {'name': f'Proveedor de Caja {index}'} for index in range(5)
+        ])
+        cls.box = cls._create_box(initial_amount=1000000.0)
+        cls.box.action_open()
+
+    def _create_bills(self, count):
+        """Facturas de proveedor publicadas, repartidas entre los proveedores"""
+        bills = self.env['account.move'].create([{
+            'move_type': 'in_invoice',
+            'partner_id': self.partners[index % len(self.partners)].id,
+            'invoice_date': '2024-01-01',
+            'invoice_line_ids': [Command.create({
+                'name': f'Servicio {index}',
+                'quantity': 1,
+                'price_unit': 10.0 + index,
+                'tax_ids': [],
+            })],
+        } for index in range(count)])
+        bills.action_post()
+        return bills
+
+    def _pay(self, bills, group_payments):
+        wizard = self.env['pay.invoice.wizard'].create({
+            'cash_type': 'petty',
+            'petty_cash_id': self.box.id,
+            'invoice_ids': [Command.set(bills.ids)],
+            'group_payments': group_payments,
+        })
+        wizard.action_pay_invoice()
+        return self.box.line_ids.filtered(lambda l: l.invoice_id in bills)
+
+    def test_grouped_payments_reconcile_only_their_invoices(self):
+        bills = self._create_bills(self.INVOICE_COUNT)
+        start = time.perf_counter()
+        lines = self._pay(bills, group_payments=True)
+        _logger.info("Pago agrupado de %s facturas desde caja: %.2fs",
+                     len(bills), time.perf_counter() - start)
+
+        self.assertEqual(len(lines), len(bills))
+        self.assertEqual(set(bills.mapped('payment_state')) - {'paid', 'in_payment'}, set())
+        payments = lines.payment_id
+        self.assertEqual(len(payments), len(self.partners), "Un pago por proveedor")
+        for payment in payments:
+            own_bills = lines.filtered(lambda l: l.payment_id == payment).invoice_id
+            self.assertEqual(payment.reconciled_bill_ids, own_bills)
+            self.assertEqual(own_bills.partner_id, payment.partner_id)
+            self.assertAlmostEqual(payment.amount, sum(own_bills.mapped('amount_total')))
+
+    def test_single_payments_reconcile_only_their_invoice(self):
+        bills = self._create_bills(20)
+        lines = self._pay(bills, group_payments=False)
+
+        self.assertEqual(len(lines.payment_id), len(bills), "Un pago por factura")
+        for line in lines:
+            self.assertEqual(line.payment_id.reconciled_bill_ids, line.invoice_id)
+            self.assertIn(line.invoice_id.payment_state, ('paid', 'in_payment'))
+
+    def test_box_balance_reflects_payments(self):
+        bills = self._create_bills(10)
+        self._pay(bills, group_payments=True)
+        self.assertAlmostEqual(
+            self.box.current_balance, 1000000.0 - sum(bills.mapped('amount_total')))
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import time
+
+from odoo.tests import tagged
+
+from .common import CashBoxTestCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestLineBalanceVolume(CashBoxTestCommon):
+    """Saldos de cajas con miles de movimientos: exactitud y costo en consultas"""
+
+    LINE_COUNT = 3000
+
+    def _create_many_lines(self, box, count, seed=0):
+        rng = random.Random(seed)
+        specs = [
+            (rng.choice((10, 20, 30)), rng.choice(('income', 'expense')), rng.randint(1, 500) / 4)
+            for _index in range(count)
+        ]
+        for start in range(0, count, 1000):
+            self._create_lines(box, specs[start:start + 1000])
+
+    def _count_queries(self, func):
+        """Cantidad de consultas SQL de ``func``, incluido el vaciado final al ORM"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.env.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - before
+
+    def test_balances_over_thousands_of_lines(self):
+        box = self._create_box(initial_amount=1000.0)
+        self._create_many_lines(box, self.LINE_COUNT)
+        self.assertEqual(len(box.line_ids), self.LINE_COUNT)
+        self.assertBalancesMatchRecompute(box)
+
+    def test_full_recompute_is_batched(self):
+        box = self._create_box(initial_amount=1000.0)
+        self._create_many_lines(box, self.LINE_COUNT)
+
+        start = time.perf_counter()
+        queries = self._count_queries(box._recompute_line_balances)
+        _logger.info("Recálculo de %s saldos: %s consultas, %.2fs",
+                     self.LINE_COUNT, queries, time.perf_counter() - start)
+        # Una pasada ordenada por caja: lectura y escritura por lotes, no por línea
+        self.assertLess(queries, self.LINE_COUNT / 50)
+
+    def test_append_cost_does_not_grow_with_box_size(self):
+        small = self._create_box(initial_amount=1000.0)
+        large = self._create_box(initial_amount=1000.0)
+        self._create_many_lines(small, 10, seed=1)
+        self._create_many_lines(large, self.LINE_COUNT, seed=2)
+        # Calentar las cachés del registro con una primera línea en cada caja
+        self._create_lines(small, [(40, 'income', 1.0)])
+        self._create_lines(large, [(40, 'income', 1.0)])
+
+        small_queries = self._count_queries(lambda: self._create_lines(small, [(40, 'expense', 2.0)]))
+        large_queries = self._count_queries(lambda: self._create_lines(large, [(40, 'expense', 2.0)]))
+        self.assertLessEqual(large_queries, small_queries)
+        self.assertBalancesMatchRecompute(large)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import CashBoxTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLineBalances(CashBoxTestCommon):
+    """El desplazamiento incremental de saldos equivale a un recálculo completo"""
+
+    def setUp(self):
+        super(TestLineBalances, self).setUp()
+        self.box = self._create_box(initial_amount=100.0)
+        self.lines = self._create_lines(self.box, [
+            (10, 'income', 50.0),
+            (20, 'expense', 30.0),
+            (30, 'expense', 10.0),
+            (40, 'income', 5.0),
+        ])
+
+    def test_create_appends(self):
+        self.assertEqual(self.lines.mapped('balance'), [150.0, 120.0, 110.0, 115.0])
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_insert_in_middle(self):
+        self._create_lines(self.box, [(25, 'expense', 7.0)])
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_insert_same_sequence_goes_after(self):
+        line = self._create_lines(self.box, [(20, 'income', 4.0)])
+        self.assertBalancesMatchRecompute(self.box)
+        self.assertAlmostEqual(line.balance, 124.0)
+
+    def test_insert_batch_interleaved(self):
+        self._create_lines(self.box, [
+            (35, 'expense', 2.0),
+            (5, 'expense', 1.0),
+            (15, 'income', 3.0),
+            (15, 'expense', 8.0),
+            (50, 'income', 9.0),
+        ])
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_change_amount(self):
+        self.lines[1].amount = 45.0
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_change_line_type(self):
+        self.lines[2].line_type = 'income'
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_change_several_lines(self):
+        self.lines[0:3].write({'amount': 12.0})
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_resequence(self):
+        self.lines[3].sequence = 15
+        self.assertBalancesMatchRecompute(self.box)
+        self.lines[0].sequence = 99
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_unlink(self):
+        self.lines[1].unlink()
+        self.assertBalancesMatchRecompute(self.box)
+        self.lines[0].unlink()
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_change_initial_amount(self):
+        self.box.initial_amount = 250.0
+        self.assertBalancesMatchRecompute(self.box)
+
+    def test_move_line_to_other_box(self):
+        other = self._create_box(initial_amount=10.0)
+        self._create_lines(other, [(10, 'income', 1.0)])
+        self.lines[1].petty_cash_id = other
+        self.assertBalancesMatchRecompute(self.box)
+        self.assertBalancesMatchRecompute(other)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestReceiptReport(TransactionCase):
+    """Impresión en lote de recibos: monto en letras almacenado y consultas constantes"""
+
+    REPORT = 'petty_cash.report_cash_receipt'
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestReceiptReport, cls).setUpClass()
+        partners = cls.env['res.partner'].create([
+            {'name': f'Beneficiario {index}', 'vat': f'1000000{index:04d}'}
+            for index in range(100)
+        ])
+        # ``create`` de los recibos no es multi: un registro por llamada
+        cls.receipts = cls.env['cash.receipt']
+        for index, partner in enumerate(partners):
+            cls.receipts |= cls.env['cash.receipt'].create({
+                'area': 'admin_gerencia' if index % 2 else 'logistica',
+                'partner_id': partner.id,
+                'amount': 100 + index + 0.25,
+                'concept': f'Entrega {index}',
+            })
+
+    def _render(self, receipts):
+        """Renderizar el reporte en HTML devolviendo el contenido y sus consultas SQL"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.env.cr.sql_log_count
+        html, _report_type = self.env['ir.actions.report']._render_qweb_html(self.REPORT, receipts.ids)
+        return html.decode(), self.env.cr.sql_log_count - before
+
+    def test_amount_in_words_is_stored(self):
+        values = self.env['report.petty_cash.report_cash_receipt']._get_report_values(self.receipts.ids)
+        self.assertEqual(values['docs'], self.receipts)
+        self.env.flush_all()
+        self.env.cr.execute(
+            "SELECT id, amount_in_words FROM cash_receipt WHERE id = ANY(%s)", [self.receipts.ids],
+        )
+        stored = dict(self.env.cr.fetchall())
+        for receipt in self.receipts:
+            self.assertEqual(stored[receipt.id], receipt.amount_to_words())
+
+    def test_batch_render_queries_do_not_grow(self):
+        # Primer renderizado: compila las plantillas y llena las cachés del registro
+        self._render(self.receipts[:1])
+
+        html_small, queries_small = self._render(self.receipts[:10])
+        html_large, queries_large = self._render(self.receipts)
+
+        self.assertEqual(queries_large, queries_small)
+        for receipt in self.receipts[:10]:
+            self.assertIn(receipt.amount_in_words, html_small)
+        for receipt in self.receipts:
+            self.assertIn(receipt.amount_in_words, html_large)
+            self.assertIn(receipt.partner_id.name.upper(), html_large)
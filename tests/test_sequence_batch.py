@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import CashBoxTestCommon
+
+SEQUENCE_DATE = '2024-03-15'
+
+
+@tagged('post_install', '-at_install')
+class TestSequenceBatch(CashBoxTestCommon):
+    """Reserva en lote de números de secuencia"""
+
+    def _create_sequence_pair(self, implementation, use_date_range):
+        """Dos secuencias idénticas: una se consume número a número, la otra en lote"""
+        return [self.env['ir.sequence'].create({
+            'name': f'Secuencia de prueba {suffix}',
+            'code': f'test.petty.cash.batch.{implementation}.{use_date_range}.{suffix}',
+            'implementation': implementation,
+            'use_date_range': use_date_range,
+            'prefix': 'T/%(range_year)s/' if use_date_range else 'T/',
+            'padding': 4,
+            'number_increment': 2,
+            'company_id': self.env.company.id,
+        }) for suffix in ('one', 'batch')]
+
+    def _count_queries(self, func):
+        self.env.flush_all()
+        before = self.env.cr.sql_log_count
+        result = func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - before, result
+
+    def test_batch_matches_one_by_one(self):
+        for implementation in ('standard', 'no_gap'):
+            for use_date_range in (False, True):
+                with self.subTest(implementation=implementation, use_date_range=use_date_range):
+                    one, batch = (
+                        seq.with_context(ir_sequence_date=SEQUENCE_DATE)
+                        for seq in self._create_sequence_pair(implementation, use_date_range)
+                    )
+                    expected = [one.next_by_code(one.code) for _index in range(5)]
+                    reserved = batch.env['ir.sequence'].next_batch_by_code(batch.code, 5)
+                    self.assertEqual(reserved, expected)
+                    self.assertEqual(reserved[0], 'T/2024/0001' if use_date_range else 'T/0001')
+                    # La secuencia continúa después del lote reservado
+                    self.assertEqual(batch.next_by_code(batch.code), one.next_by_code(one.code))
+
+    def test_batch_is_one_query_regardless_of_size(self):
+        for implementation in ('standard', 'no_gap'):
+            with self.subTest(implementation=implementation):
+                _one, sequence = self._create_sequence_pair(implementation, False)
+                Sequence = self.env['ir.sequence']
+                Sequence.next_batch_by_code(sequence.code, 1)
+                small, _names = self._count_queries(lambda: Sequence.next_batch_by_code(sequence.code, 1))
+                large, names = self._count_queries(lambda: Sequence.next_batch_by_code(sequence.code, 500))
+                self.assertEqual(large, small)
+                self.assertEqual(len(set(names)), 500)
+
+    def test_box_numbers_reserved_in_one_call(self):
+        boxes = self.env['petty.cash'].browse([self._create_box().id for _index in range(20)])
+        boxes[:1]._get_next_sequences()
+        queries_one, _names = self._count_queries(boxes[:1]._get_next_sequences)
+        queries_all, names = self._count_queries(boxes._get_next_sequences)
+        self.assertEqual(queries_all, queries_one)
+        self.assertEqual(len(set(names)), len(boxes))
+        self.assertEqual(names, sorted(names))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import io
+import logging
+import random
+import time
+
+from odoo.tests import HttpCase, tagged
+
+from odoo.addons.petty_cash.controllers.main import XLSX_EXPORT_HEADERS
+
+from .common import CashBoxTestCommon
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestXlsxExport(CashBoxTestCommon, HttpCase):
+    """Exportación a Excel de cajas grandes: contenido, orden y validación de parámetros"""
+
+    LINE_COUNT = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestXlsxExport, cls).setUpClass()
+        cls.env.ref('base.user_admin').groups_id |= cls.env.ref('petty_cash.group_cash_manager')
+
+    def setUp(self):
+        super(TestXlsxExport, self).setUp()
+        self.authenticate('admin', 'admin')
+
+    def _export(self, model, ids):
+        return self.url_open(f'/cash_box/export_xlsx?model={model}&ids={ids}')
+
+    def _read_rows(self, content):
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        return list(workbook['Movimientos'].iter_rows(values_only=True))
+
+    def test_export_large_box(self):
+        if openpyxl is None:
+            self.skipTest("Se requiere openpyxl para leer el archivo exportado")
+        rng = random.Random(0)
+        box = self._create_box(initial_amount=1000.0)
+        for _batch in range(self.LINE_COUNT // 1000):
+            self._create_lines(box, [
+                (rng.choice((10, 20, 30)), rng.choice(('income', 'expense')), rng.randint(1, 500) / 4)
+                for _index in range(1000)
+            ])
+        other = self._create_box(initial_amount=50.0)
+        self._create_lines(other, [(10, 'income', 5.0), (20, 'expense', 2.5)])
+        # Las cajas en borrador comparten el nombre: distinguirlas en la primera columna
+        box.name, other.name = 'Caja grande', 'Caja pequeña'
+        self.env.flush_all()
+
+        start = time.perf_counter()
+        response = self._export('petty.cash', f'{box.id},{other.id}')
+        _logger.info("Exportación de %s movimientos: %s bytes, %.2fs",
+                     self.LINE_COUNT + 2, len(response.content), time.perf_counter() - start)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('spreadsheetml', response.headers['Content-Type'])
+
+        rows = self._read_rows(response.content)
+        self.assertEqual(list(rows[0]), XLSX_EXPORT_HEADERS)
+        self.assertEqual(len(rows), self.LINE_COUNT + 3)
+
+        # Las filas de cada caja son contiguas y siguen el orden de acumulación del saldo
+        for cash_box in (box, other):
+            box_rows = [row for row in rows[1:] if row[0] == cash_box.name]
+            self.assertEqual(len(box_rows), len(cash_box.line_ids))
+            lines = cash_box.line_ids.sorted(lambda l: (l.sequence, l.id))
+            self.assertEqual([row[5] for row in box_rows], lines.mapped('description'))
+            for row, line in zip(box_rows, lines):
+                self.assertAlmostEqual(row[6 if line.line_type == 'income' else 7], line.amount, places=2)
+                self.assertAlmostEqual(row[8], line.balance, places=2)
+        names = [row[0] for row in rows[1:]]
+        self.assertEqual(len([1 for prev, cur in zip(names, names[1:]) if prev != cur]), 1)
+
+    def test_export_rejects_invalid_parameters(self):
+        box = self._create_box()
+        self.assertEqual(self._export('res.partner', box.id).status_code, 400)
+        self.assertEqual(self._export('petty.cash', 'abc').status_code, 400)